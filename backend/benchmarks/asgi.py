@@ -0,0 +1,40 @@
+# backend/benchmarks/asgi.py
+# 直接呼叫 ASGI app 的極簡 HTTP 用戶端（不經過網路，也不需要額外套件）
+
+import asyncio
+import json
+from urllib.parse import urlencode
+
+class AsgiResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+async def request(app, path, params=None, method='GET', headers=None, body=b''):
+    query = urlencode(params or {}, doseq=True)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'status': None, 'headers': {}, 'chunks': []}
+
+    async def receive():
+        if pending: return pending.pop(0)
+        await asyncio.Future()  # 不會斷線；回應結束後由框架取消
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode().lower(): v.decode() for k, v in message.get('headers', [])}
+        elif message['type'] == 'http.response.body':
+            response['chunks'].append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return AsgiResponse(response['status'], response['headers'], b''.join(response['chunks']))
@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_lineup.py
+# 一位投手對整排打線：一次 /api/lineup-matchup vs. 每位打者各呼叫 /api/pvb-stats 與 /api/outcome-simulator
+# 投手數據放在本地 Statcast 儲存（離線模式），--fetch-ms 另外模擬每次讀取的延遲（遠端磁碟 / Savant 補齊）。
+# 冷快取：每輪開始前清空對決快取；暖快取：同一份請求再送一次。
+# 執行方式（於 backend 目錄）: python -m benchmarks.bench_lineup --pitches 30000 --fetch-ms 50
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks import harness
+
+_tmp = harness.prepare_environment('statcast-lineup-')
+
+import main  # noqa: E402
+import statcast_store  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+from benchmarks.fixtures import FOCUS_BATTER_NAME, FOCUS_PITCHER_NAME, LINEUP_NAMES, make_pitcher_history, make_register  # noqa: E402
+from matchup_cache import MatchupCache  # noqa: E402
+
+PITCHER = ' '.join(FOCUS_PITCHER_NAME)
+LINEUP = [' '.join(FOCUS_BATTER_NAME)] + [' '.join(name) for name in LINEUP_NAMES]
+
+def install_fixtures(pitches, fetch_seconds):
+    path = os.path.join(_tmp, 'history.parquet')
+    make_pitcher_history(pitches).to_parquet(path, index=False)
+    statcast_store.import_fixture(path)
+    harness.install_registry(make_register())
+    harness.disable_headshots()
+    reads = {'count': 0}
+    load = main.load_statcast_pitcher
+
+    def counted_load(*args, **kwargs):
+        reads['count'] += 1
+        time.sleep(fetch_seconds)
+        return load(*args, **kwargs)
+
+    main.load_statcast_pitcher = counted_load
+    return reads
+
+async def individual(lineup, concurrent):
+    # 舊做法：每位打者兩個端點，各自解析姓名、各自讀取對戰數據
+    calls = [(path, {'pitcher': PITCHER, 'batter': batter}) for batter in lineup for path in ('/api/pvb-stats', '/api/outcome-simulator')]
+    if concurrent:
+        responses = await asyncio.gather(*(request(main.app, path, params) for path, params in calls))
+    else:
+        responses = [await request(main.app, path, params) for path, params in calls]
+    bodies = [response.json() for response in responses]
+    return [{"pvb": pvb, "outcomes": outcomes} for pvb, outcomes in zip(bodies[::2], bodies[1::2])]
+
+async def bulk(lineup):
+    response = await request(main.app, '/api/lineup-matchup', {'pitcher': PITCHER, 'batters': lineup})
+    assert response.status == 200, response.status
+    return [{"pvb": entry['pvb'], "outcomes": entry['outcomes']} for entry in response.json()['batters']]
+
+async def measure(fn, reads, repeat, cold):
+    samples, read_counts = [], []
+    for _ in range(repeat):
+        if cold: main.matchup_cache = MatchupCache()
+        before = reads['count']
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+        read_counts.append(reads['count'] - before)
+    return statistics.median(samples), min(samples), max(read_counts)
+
+async def run(args):
+    reads = install_fixtures(args.pitches, args.fetch_ms / 1000)
+    lineup = LINEUP[:args.batters]
+
+    # 兩種做法的每位打者結果必須一致
+    main.matchup_cache = MatchupCache()
+    assert await bulk(lineup) == await individual(lineup, concurrent=False)
+
+    modes = [
+        (f'逐一呼叫 ({2 * len(lineup)} 個請求)', lambda: individual(lineup, concurrent=False)),
+        (f'並行呼叫 ({2 * len(lineup)} 個請求)', lambda: individual(lineup, concurrent=True)),
+        ('整排打線 (1 個請求)', lambda: bulk(lineup)),
+    ]
+    print(f"投手投球數: {args.pitches}，打者數: {len(lineup)}，每次讀取另加 {args.fetch_ms:.0f} ms")
+    print(f"{'做法':<24}{'快取':<6}{'讀取次數':>10}{'中位數 (ms)':>14}{'最佳 (ms)':>12}")
+    for label, fn in modes:
+        for cold in (True, False):
+            median, best, n_reads = await measure(fn, reads, args.repeat, cold)
+            print(f"{label:<24}{'冷' if cold else '暖':<6}{n_reads:>10}{median * 1000:>14.1f}{best * 1000:>12.1f}")
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="整排打線對決端點與逐一呼叫的效能比較")
+    parser.add_argument('--pitches', type=int, default=30000, help="投手生涯投球數")
+    parser.add_argument('--batters', type=int, default=len(LINEUP), choices=range(1, len(LINEUP) + 1), metavar=f'1-{len(LINEUP)}')
+    parser.add_argument('--fetch-ms', type=float, default=0.0, help="每次讀取投手數據額外的延遲")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_load.py
+# 負載測試：在重量級端點（模擬慢速 Savant 下載）執行中時，量測輕量端點的延遲分佈
+# 執行方式（於 backend 目錄）:
+#   python -m benchmarks.bench_load                # 使用執行緒池（目前的實作）
+#   python -m benchmarks.bench_load --inline       # 在 event loop 上直接執行阻塞函式（舊行為）
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks import harness
+
+harness.prepare_environment('statcast-bench-')
+
+import main  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+from benchmarks.fixtures import make_pitcher_history, make_register  # noqa: E402
+
+def install_fixtures(fetch_seconds, inline):
+    register = make_register()
+    harness.install_registry(register)
+    harness.disable_headshots()
+    history = make_pitcher_history(20000)
+
+    def slow_load(start_dt, end_dt, pitcher_id, batter_id=None, columns=None):
+        time.sleep(fetch_seconds)  # 模擬 Savant 下載 / 磁碟讀取
+        return history if batter_id is None else history[history['batter'] == batter_id]
+
+    main.load_statcast_pitcher = slow_load
+    if inline:
+        async def run_inline(fn, *args, timeout=None, **kwargs):
+            return fn(*args, **kwargs)
+        main.run_io = run_inline
+    # 重量級請求各查詢不同的打者：對決快取以 (投手, 打者) 為鍵，同一組合只會讀取一次
+    return (register['name_first'] + ' ' + register['name_last']).drop_duplicates().tolist()
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) * 1000 if samples else float('nan')
+
+async def run(args, batters):
+    app = main.app
+    heavy_statuses = []
+
+    async def heavy(batter):
+        response = await request(app, '/api/pvb-stats', {'pitcher': 'Gerrit Cole', 'batter': batter})
+        heavy_statuses.append(response.status)
+
+    heavy_tasks = [asyncio.create_task(heavy(batters[i % len(batters)])) for i in range(args.heavy)]
+    await asyncio.sleep(0)
+
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await request(app, '/api/player-search', {'name': 'Jo'})
+        latencies.append(time.perf_counter() - start)
+        assert response.status == 200, response.status
+        await asyncio.sleep(args.interval)
+    await asyncio.gather(*heavy_tasks)
+
+    print(f"模式: {'event loop 上直接執行' if args.inline else '執行緒池'}，重量級請求: {args.heavy}，每次下載 {args.fetch_seconds:.1f}s")
+    print(f"輕量端點 /api/player-search 請求數: {len(latencies)}")
+    print(f"  p50 {percentile(latencies, 50):8.1f} ms   p95 {percentile(latencies, 95):8.1f} ms   p99 {percentile(latencies, 99):8.1f} ms   max {max(latencies) * 1000:8.1f} ms")
+    statuses = {status: heavy_statuses.count(status) for status in sorted(set(heavy_statuses))}
+    print(f"重量級端點 /api/pvb-stats 狀態碼: {statuses}")
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="重量級端點執行中時的輕量端點延遲")
+    parser.add_argument('--heavy', type=int, default=30, help="同時送出的重量級請求數（超過排隊上限的會收到 503）")
+    parser.add_argument('--fetch-seconds', type=float, default=1.0)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--interval', type=float, default=0.01)
+    parser.add_argument('--inline', action='store_true', help="不使用執行緒池，重現舊的阻塞行為")
+    args = parser.parse_args(argv)
+    batters = install_fixtures(args.fetch_seconds, args.inline)
+    asyncio.run(run(args, batters))
+
+if __name__ == '__main__':
+    main_cli()
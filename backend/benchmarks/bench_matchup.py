@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_matchup.py
+# 比較 /api/matchup 的單次計算與舊版四個端點各自計算的耗時
+# 執行方式（於 backend 目錄）: python -m benchmarks.bench_matchup --pitches 60000 --focus-share 0.1
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import FOCUS_BATTER_ID, make_pitcher_history
+from matchup_panels import compute_matchup_panels
+
+# --- 舊版實作（各端點各自篩選、各自 groupby） ---
+def legacy_pvb(data, batter_id):
+    matchup_data = data[data['batter'] == batter_id].copy()
+    final_events = matchup_data.loc[matchup_data.groupby(['game_date', 'at_bat_number'])['pitch_number'].idxmax()]
+    events = final_events['events'].dropna()
+    at_bats = events[~events.isin(['walk', 'hit_by_pitch', 'sac_fly', 'sac_bunt', 'intentional_walk'])].count()
+    hits = events[events.isin(['single', 'double', 'triple', 'home_run'])].count()
+    return { "total_pa": int(len(events)), "at_bats": int(at_bats), "hits": int(hits), "strikeouts": int(events.str.contains('strikeout').sum()) }
+
+def legacy_timeline(data, batter_id):
+    matchup_data = data[data['batter'] == batter_id].copy()
+    matchup_data['game_date'] = pd.to_datetime(matchup_data['game_date'])
+    timeline = []
+    for (game_date, at_bat_number), group in matchup_data.groupby(['game_date', 'at_bat_number']):
+        pitches = group.sort_values(by='pitch_number').copy()
+        final_event = pitches['events'].dropna().iloc[-1] if not pitches['events'].dropna().empty else "進行中"
+        timeline.append({ "game_date": game_date.strftime('%Y-%m-%d'), "at_bat_number": int(at_bat_number), "final_event": final_event, "pitches": pitches[['pitch_number', 'pitch_name', 'release_speed', 'description']].replace({np.nan: None}).to_dict(orient='records') })
+    return sorted(timeline, key=lambda x: (x['game_date'], x['at_bat_number']), reverse=True)
+
+def legacy_outcomes(data, batter_id):
+    matchup_data = data[data['batter'] == batter_id].copy()
+    events = matchup_data.dropna(subset=['events'])
+    final_events = events.loc[events.groupby(['game_date', 'at_bat_number'])['pitch_number'].idxmax()]
+    total_pa = len(final_events)
+    outcomes = { "Strikeout": final_events['events'].str.contains('strikeout').sum(), "Walk": final_events['events'].str.contains('walk|hit_by_pitch').sum() }
+    return {key: round((value / total_pa) * 100, 1) for key, value in outcomes.items()}
+
+def legacy_trajectory(data, batter_id):
+    matchup_data = data[data['batter'] == batter_id].copy()
+    columns = ['pitch_type', 'release_speed', 'release_pos_x', 'release_pos_y', 'release_pos_z', 'plate_x', 'plate_z', 'sz_top', 'sz_bot']
+    return matchup_data[columns].dropna().to_dict(orient='records')
+
+def run_legacy(data, batter_id):
+    return (legacy_pvb(data, batter_id), legacy_timeline(data, batter_id), legacy_outcomes(data, batter_id), legacy_trajectory(data, batter_id))
+
+def run_composite(data, batter_id):
+    matchup_data = data[data['batter'] == batter_id]
+    return compute_matchup_panels(matchup_data, "pitcher", "batter")
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), min(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="對決面板計算效能比較")
+    parser.add_argument('--pitches', type=int, default=30000, help="投手生涯投球數")
+    parser.add_argument('--focus-share', type=float, default=0.05, help="面對指定打者的打席比例")
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    data = make_pitcher_history(args.pitches, focus_share=args.focus_share)
+    matchup = data[data['batter'] == FOCUS_BATTER_ID]
+    n_pa = matchup.groupby(['game_date', 'at_bat_number']).ngroups
+    print(f"投手投球數: {len(data)}，對決投球數: {len(matchup)}，對決打席數: {n_pa}")
+
+    # 兩種實作的時間軸結果必須一致
+    assert run_composite(data, FOCUS_BATTER_ID)['timeline'] == legacy_timeline(data, FOCUS_BATTER_ID)
+
+    legacy_median, legacy_best = timeit(lambda: run_legacy(data, FOCUS_BATTER_ID), args.repeat)
+    composite_median, composite_best = timeit(lambda: run_composite(data, FOCUS_BATTER_ID), args.repeat)
+    print(f"{'實作':<24}{'中位數 (ms)':>14}{'最佳 (ms)':>12}")
+    print(f"{'四個端點各自計算':<24}{legacy_median * 1000:>14.1f}{legacy_best * 1000:>12.1f}")
+    print(f"{'/api/matchup 單次計算':<24}{composite_median * 1000:>14.1f}{composite_best * 1000:>12.1f}")
+    print(f"加速: {legacy_median / composite_median:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# backend/benchmarks/bench_memory.py
+# 每個請求的尖峰 RSS：讀取完整欄位 / 原始型別（舊做法）vs. 欄位投影 + float32 / 整數 / 類別（目前做法）
+# 每個 (情境, 模式) 在獨立的子行程中執行；fixture 也在另一個子行程中建立，
+# 否則父行程的尖峰 RSS 會經 fork / exec 帶進子行程的 ru_maxrss，相減後永遠是 0。
+# Linux 上另以 /proc/self/clear_refs 重設尖峰，改讀 VmHWM。
+# 合成數據會補上額外的欄位（含長文字欄位），讓寬度接近真實 Statcast 的 90 多欄。
+# 執行方式（於 backend 目錄）: python -m benchmarks.bench_memory --pitches 30000 --league-day 4500
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+SCENARIOS = ('matchup', 'pitcher-season', 'leaderboard-week')
+MODES = ('before', 'after')
+WEEK = 7
+
+def _max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == 'darwin' else rss  # macOS 以 bytes 回報
+
+def _reset_peak_rss():
+    # Linux：寫入 5 會把 VmHWM 重設為目前的 RSS
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'): return float(line.split()[1])
+    except OSError:
+        pass
+    return _max_rss_kb()
+
+def widen(frame, extra_columns, seed=0):
+    # 模擬 Statcast 其餘欄位：數值欄位 + 重複度高的短文字 + 每列不同的長描述 (des)
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    n = len(frame)
+    extra = {f'extra_{i}': rng.normal(0, 1, n) for i in range(extra_columns)}
+    extra.update({
+        'player_name': rng.choice(['Cole, Gerrit', 'Judge, Aaron', 'Ohtani, Shohei'], n).astype(object),
+        'home_team': rng.choice(['NYY', 'BOS', 'LAD', 'HOU'], n).astype(object),
+        'away_team': rng.choice(['TOR', 'TB', 'SEA', 'TEX'], n).astype(object),
+        'p_throws': rng.choice(['L', 'R'], n).astype(object),
+        'type': rng.choice(['B', 'S', 'X'], n).astype(object),
+        'inning_topbot': rng.choice(['Top', 'Bot'], n).astype(object),
+        'des': np.array([f"Batter {b} grounds out, shortstop to first baseman, pitch {i}." for i, b in enumerate(frame['batter'].to_numpy())], dtype=object),
+    })
+    return frame.assign(**extra)
+
+def setup(directory, pitches, league_day, extra_columns):
+    # 建立本地儲存（9 個賽季的王牌投手）與 7 天的全聯盟下載結果
+    os.environ['STATCAST_STORE_DIR'] = os.path.join(directory, 'statcast')
+    import numpy as np
+    import statcast_store
+    from benchmarks.fixtures import make_pitches
+    year = date.today().year
+    history = widen(make_pitches(pitches, seasons=range(year - 8, year + 1), focus_share=0.05), extra_columns)
+    path = os.path.join(directory, 'history.parquet')
+    history.to_parquet(path, index=False)
+    statcast_store.import_fixture(path)
+    league_pitchers = np.concatenate([[543037], 400000 + np.arange(300)])
+    for i in range(WEEK):
+        day = date(year, 6, 1) + timedelta(days=i)
+        frame = widen(make_pitches(league_day, pitcher_ids=league_pitchers, seasons=[year], seed=i).assign(game_date=day), extra_columns, seed=i)
+        frame.to_parquet(os.path.join(directory, f'league-{i}.parquet'), index=False)
+
+def child(directory, scenario, mode):
+    os.environ['STATCAST_STORE_DIR'] = os.path.join(directory, 'statcast')
+    os.environ['STATCAST_OFFLINE'] = '1'
+    import pandas as pd
+    import statcast_store
+    from benchmarks.fixtures import FOCUS_BATTER_ID, FOCUS_PITCHER_ID
+    from leaderboard_store import LEADERBOARD_COLUMNS, summarize_day
+    from matchup_panels import PANEL_COLUMNS, compute_matchup_panels
+    from pitcher_profiles import PROFILE_COLUMNS, build_profile
+    from trajectory_physics import PHYSICS_COLUMNS
+    lean = mode == 'after'
+    year = date.today().year
+    gc.collect()
+    peak = _peak_rss_kb if _reset_peak_rss() else _max_rss_kb
+    base = peak()
+
+    if scenario == 'matchup':
+        columns = list(dict.fromkeys(PANEL_COLUMNS + PHYSICS_COLUMNS)) if lean else None
+        frame = statcast_store.load_statcast_pitcher('2017-01-01', f'{year}-12-31', FOCUS_PITCHER_ID, batter_id=FOCUS_BATTER_ID, columns=columns, compact=lean)
+        compute_matchup_panels(frame, 'P', 'B')
+    elif scenario == 'pitcher-season':
+        frame = statcast_store.load_statcast_pitcher(f'{year}-01-01', f'{year}-12-31', FOCUS_PITCHER_ID, columns=PROFILE_COLUMNS if lean else None, compact=lean)
+        build_profile(frame)
+    else:
+        # before：一週的完整欄位串接後再彙總（原本的 /api/leaderboards）；after：逐日投影 + 縮小型別
+        paths = [os.path.join(directory, f'league-{i}.parquet') for i in range(WEEK)]
+        if lean:
+            frame = pd.concat([statcast_store.compact_frame(pd.read_parquet(path), LEADERBOARD_COLUMNS) for path in paths], ignore_index=True)
+        else:
+            frame = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+        summarize_day(date(year, 6, 1), frame)
+
+    result = {"rows": int(len(frame)), "columns": int(frame.shape[1]), "frame_kb": frame.memory_usage(deep=True).sum() / 1024, "peak_rss_kb": peak() - base}
+    print(json.dumps(result))
+
+def _run_module(*args):
+    return subprocess.run([sys.executable, '-m', 'benchmarks.bench_memory', *args], check=True, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def run_child(directory, scenario, mode):
+    output = _run_module('--child', directory, scenario, mode)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Statcast 數據框的記憶體用量比較")
+    parser.add_argument('--pitches', type=int, default=30000, help="王牌投手 9 個賽季的投球數")
+    parser.add_argument('--league-day', type=int, default=4500, help="全聯盟一天的投球數")
+    parser.add_argument('--extra-columns', type=int, default=50, help="補上的額外數值欄位數")
+    parser.add_argument('--child', nargs=3, metavar=('DIR', 'SCENARIO', 'MODE'), help=argparse.SUPPRESS)
+    parser.add_argument('--setup', metavar='DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(*args.child)
+        return
+    if args.setup:
+        setup(args.setup, args.pitches, args.league_day, args.extra_columns)
+        return
+
+    # 父行程只負責排程，不載入任何數據
+    directory = tempfile.mkdtemp(prefix='statcast-memory-')
+    _run_module('--setup', directory, '--pitches', str(args.pitches), '--league-day', str(args.league_day), '--extra-columns', str(args.extra_columns))
+    print(f"{'情境':<18}{'模式':<8}{'列數':>8}{'欄數':>6}{'數據框 KB':>12}{'尖峰 RSS KB':>14}")
+    for scenario in SCENARIOS:
+        results = {mode: run_child(directory, scenario, mode) for mode in MODES}
+        for mode, result in results.items():
+            print(f"{scenario:<18}{mode:<8}{result['rows']:>8}{result['columns']:>6}{result['frame_kb']:>12.0f}{result['peak_rss_kb']:>14.0f}")
+        before, after = results['before'], results['after']
+        if before['peak_rss_kb'] > 0:
+            print(f"{'':<18}{'':<8}尖峰 RSS 減少 {1 - after['peak_rss_kb'] / before['peak_rss_kb']:.0%}，數據框減少 {1 - after['frame_kb'] / before['frame_kb']:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# backend/benchmarks/bench_trajectory_payload.py
+# 比較 3D 軌跡的 JSON 與欄式二進位格式（packed / Arrow IPC）的序列化時間與大小
+# 執行方式（於 backend 目錄）: python -m benchmarks.bench_trajectory_payload --pitches 3000 30000
+
+import argparse
+import json
+import statistics
+import time
+
+import pyarrow as pa
+
+from benchmarks.fixtures import make_pitcher_history
+from matchup_panels import trajectory_frame, trajectory_points
+from trajectory_codec import decode_packed, encode_arrow_chunks, encode_packed_chunks
+
+def encode_json(frame_source):
+    # 與 FastAPI 預設相同：to_dict(records) 後以 json 序列化
+    return json.dumps(trajectory_points(frame_source)).encode('utf-8')
+
+def encode_packed(frame_source):
+    return b''.join(encode_packed_chunks(trajectory_frame(frame_source)))
+
+def encode_arrow(frame_source):
+    return b''.join(encode_arrow_chunks(trajectory_frame(frame_source)))
+
+def timeit(fn, repeat):
+    samples, payload = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), payload
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="3D 軌跡回應格式效能比較")
+    parser.add_argument('--pitches', type=int, nargs='+', default=[3000, 30000])
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    print(f"{'投球數':>8}  {'格式':<8}{'序列化 (ms)':>12}{'解碼 (ms)':>12}{'大小 (KB)':>12}{'相對 JSON':>10}")
+    for n in args.pitches:
+        data = make_pitcher_history(n)
+        json_time, json_payload = timeit(lambda: encode_json(data), args.repeat)
+        json_decode, _ = timeit(lambda: json.loads(json_payload), args.repeat)
+        packed_time, packed_payload = timeit(lambda: encode_packed(data), args.repeat)
+        packed_decode, _ = timeit(lambda: decode_packed(packed_payload), args.repeat)
+        arrow_time, arrow_payload = timeit(lambda: encode_arrow(data), args.repeat)
+        arrow_decode, _ = timeit(lambda: pa.ipc.open_stream(arrow_payload).read_all(), args.repeat)
+
+        assert sum(len(chunk['pitch_type']) for chunk in decode_packed(packed_payload)) == len(trajectory_frame(data))
+        for name, encode_time, decode_time, payload in [('json', json_time, json_decode, json_payload), ('packed', packed_time, packed_decode, packed_payload), ('arrow', arrow_time, arrow_decode, arrow_payload)]:
+            print(f"{len(data):>8}  {name:<8}{encode_time * 1000:>12.2f}{decode_time * 1000:>12.2f}{len(payload) / 1024:>12.1f}{len(payload) / len(json_payload):>10.2f}")
+
+if __name__ == '__main__':
+    main()
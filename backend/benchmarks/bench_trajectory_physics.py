@@ -0,0 +1,61 @@
+# backend/benchmarks/bench_trajectory_physics.py
+# 比較伺服器端軌跡取樣：NumPy broadcasting vs. 逐球 Python 迴圈（前端目前的做法）
+# 執行方式（於 backend 目錄）: python -m benchmarks.bench_trajectory_physics --pitches 3000 --samples 20 50
+
+import argparse
+import json
+import math
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import make_pitcher_history
+from trajectory_physics import GRAVITY, PLATE_Y, Y0, evaluate, pitch_paths
+
+def legacy_paths(frame, samples):
+    # 逐球逐點計算，與 evaluate 使用相同的模型，作為正確性與速度的比較基準
+    paths = []
+    for row in frame.itertuples(index=False):
+        def time_at(y_target):
+            distance = Y0 - y_target
+            return (-row.vy0 - math.sqrt(row.vy0 ** 2 - 2 * row.ay * distance)) / row.ay
+        t_release, t_plate = time_at(row.release_pos_y), time_at(PLATE_Y)
+        x50 = row.release_pos_x - row.vx0 * t_release - 0.5 * row.ax * t_release ** 2
+        z50 = row.release_pos_z - row.vz0 * t_release - 0.5 * row.az * t_release ** 2
+        points = []
+        for i in range(samples):
+            t = t_release + (t_plate - t_release) * i / (samples - 1)
+            points.append((x50 + row.vx0 * t + 0.5 * row.ax * t * t, Y0 + row.vy0 * t + 0.5 * row.ay * t * t, z50 + row.vz0 * t + 0.5 * row.az * t * t))
+        paths.append(points)
+    return np.array(paths, dtype=np.float32)
+
+def timeit(fn, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="投球軌跡物理引擎效能比較")
+    parser.add_argument('--pitches', type=int, default=3000)
+    parser.add_argument('--samples', type=int, nargs='+', default=[20, 50])
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    data = make_pitcher_history(args.pitches)
+    print(f"投球數: {len(data)}")
+    print(f"{'取樣點':>6}{'迴圈 (ms)':>12}{'向量化 (ms)':>14}{'加速':>8}{'JSON 含衍生 (ms)':>18}{'大小 (KB)':>12}")
+    for samples in args.samples:
+        legacy_time, expected = timeit(lambda: legacy_paths(data, samples), max(1, args.repeat // 3))
+        vector_time, (valid, paths, _, t_plate) = timeit(lambda: evaluate(data, samples), args.repeat)
+        assert len(valid) == len(data) and np.allclose(paths, expected, atol=1e-3)
+        assert np.allclose(paths[:, -1, 1], PLATE_Y, atol=1e-3)
+        payload_time, payload = timeit(lambda: json.dumps(pitch_paths(data, samples, include_derived=True)), args.repeat)
+        print(f"{samples:>6}{legacy_time * 1000:>12.1f}{vector_time * 1000:>14.2f}{legacy_time / vector_time:>7.0f}x{payload_time * 1000:>18.1f}{len(payload) / 1024:>12.1f}")
+    print(f"(重力常數 {GRAVITY} ft/s^2；induced_break_z_in 已扣除重力)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# backend/benchmarks/fixtures.py
+# 合成的 Statcast 風格數據，讓效能測試可以離線、可重現地執行
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+PITCH_TYPES = {
+    'FF': ('4-Seam Fastball', 94.5, 2300),
+    'SI': ('Sinker', 93.0, 2150),
+    'SL': ('Slider', 86.0, 2450),
+    'CH': ('Changeup', 85.5, 1750),
+    'CU': ('Curveball', 79.5, 2600),
+}
+# 打席結果與機率（最後一球）
+PA_EVENTS = {
+    'field_out': 0.44, 'strikeout': 0.23, 'single': 0.14, 'walk': 0.08, 'double': 0.045,
+    'home_run': 0.03, 'hit_by_pitch': 0.01, 'sac_fly': 0.007, 'grounded_into_double_play': 0.015, 'triple': 0.003,
+}
+NON_FINAL_DESCRIPTIONS = ['ball', 'called_strike', 'foul', 'swinging_strike', 'blocked_ball']
+FINAL_DESCRIPTIONS = {'strikeout': 'swinging_strike', 'walk': 'ball', 'hit_by_pitch': 'hit_by_pitch'}
+
+FOCUS_PITCHER_ID = 543037
+FOCUS_BATTER_ID = 592450
+
+def _season_dates(seasons):
+    days = []
+    for season in seasons:
+        start = date(season, 4, 1)
+        days.extend(start + timedelta(days=i) for i in range(0, 183))
+    return np.array(days, dtype='datetime64[D]')
+
+def make_pitches(n_pitches=30000, pitcher_ids=(FOCUS_PITCHER_ID,), n_batters=400, seasons=range(2017, 2026),
+                 focus_batter=FOCUS_BATTER_ID, focus_share=0.0, pas_per_game=25, seed=0):
+    rng = np.random.default_rng(seed)
+    pitcher_ids = np.asarray(pitcher_ids)
+
+    # 每個打席 1~7 球
+    n_pa = max(1, n_pitches // 4)
+    lengths = rng.integers(1, 8, n_pa)
+    total = int(lengths.sum())
+    pa_of_pitch = np.repeat(np.arange(n_pa), lengths)
+    pa_starts = np.cumsum(lengths) - lengths
+    pitch_number = np.arange(total) - np.repeat(pa_starts, lengths) + 1
+    is_last = pitch_number == np.repeat(lengths, lengths)
+
+    # 打席 -> 比賽 / 投手 / 打者
+    game_of_pa = np.arange(n_pa) // pas_per_game
+    n_games = int(game_of_pa.max()) + 1
+    all_dates = _season_dates(seasons)
+    game_dates = np.sort(rng.choice(all_dates, n_games, replace=n_games > len(all_dates)))
+    pitcher_of_game = rng.choice(pitcher_ids, n_games)
+    batter_pool = 600000 + np.arange(n_batters)
+    batter_of_pa = rng.choice(batter_pool, n_pa)
+    if focus_batter is not None and focus_share > 0:
+        batter_of_pa = np.where(rng.random(n_pa) < focus_share, focus_batter, batter_of_pa)
+    stand_of_batter = rng.choice(np.array(['L', 'R']), n_pa)
+    at_bat_number = (np.arange(n_pa) % pas_per_game) + 1
+
+    event_names = np.array(list(PA_EVENTS.keys()), dtype=object)
+    event_of_pa = rng.choice(event_names, n_pa, p=np.array(list(PA_EVENTS.values())))
+    events = np.where(is_last, event_of_pa[pa_of_pitch], None)
+    descriptions = rng.choice(np.array(NON_FINAL_DESCRIPTIONS, dtype=object), total)
+    final_desc = np.array([FINAL_DESCRIPTIONS.get(e, 'hit_into_play') for e in event_of_pa], dtype=object)
+    descriptions = np.where(is_last, final_desc[pa_of_pitch], descriptions)
+
+    type_codes = np.array(list(PITCH_TYPES.keys()), dtype=object)
+    type_idx = rng.choice(len(type_codes), total, p=[0.4, 0.15, 0.2, 0.15, 0.1])
+    pitch_type = type_codes[type_idx]
+    names = np.array([PITCH_TYPES[t][0] for t in type_codes], dtype=object)
+    base_speed = np.array([PITCH_TYPES[t][1] for t in type_codes])
+    base_spin = np.array([PITCH_TYPES[t][2] for t in type_codes])
+
+    release_speed = base_speed[type_idx] + rng.normal(0, 1.2, total)
+    batted = np.isin(events, ['single', 'double', 'triple', 'home_run', 'field_out', 'sac_fly', 'grounded_into_double_play'])
+    game_of_pitch = game_of_pa[pa_of_pitch]
+
+    df = pd.DataFrame({
+        'pitch_type': pitch_type,
+        'game_date': pd.to_datetime(game_dates[game_of_pitch]),
+        'release_speed': release_speed,
+        'release_pos_x': rng.normal(-1.8, 0.15, total),
+        'release_pos_z': rng.normal(5.9, 0.12, total),
+        'pitcher': pitcher_of_game[game_of_pitch],
+        'batter': batter_of_pa[pa_of_pitch],
+        'events': events,
+        'description': descriptions,
+        'stand': stand_of_batter[pa_of_pitch],
+        'balls': np.minimum(pitch_number - 1, rng.integers(0, 4, total)),
+        'strikes': np.minimum(pitch_number - 1, rng.integers(0, 3, total)),
+        'pfx_x': rng.normal(-0.5, 0.5, total),
+        'pfx_z': rng.normal(0.9, 0.5, total),
+        'plate_x': rng.normal(0, 0.8, total),
+        'plate_z': rng.normal(2.4, 0.8, total),
+        'vx0': rng.normal(6, 3, total),
+        'vy0': -release_speed * 1.4667 * 0.985,
+        'vz0': rng.normal(-5, 2, total),
+        'ax': rng.normal(-10, 6, total),
+        'ay': rng.normal(28, 2, total),
+        'az': rng.normal(-20, 8, total),
+        'sz_top': rng.normal(3.4, 0.1, total),
+        'sz_bot': rng.normal(1.6, 0.08, total),
+        'hit_distance_sc': np.where(batted, rng.normal(220, 90, total).clip(5, 470), np.nan),
+        'launch_speed': np.where(batted, rng.normal(89, 12, total).clip(30, 121), np.nan),
+        'release_spin_rate': base_spin[type_idx] + rng.normal(0, 80, total),
+        'release_extension': rng.normal(6.4, 0.25, total),
+        'game_pk': 700000 + game_of_pitch,
+        'release_pos_y': rng.normal(54.1, 0.25, total),
+        'at_bat_number': at_bat_number[pa_of_pitch],
+        'pitch_number': pitch_number,
+        'pitch_name': names[type_idx],
+    })
+    # Statcast 原始排序：由新到舊
+    return df.sort_values(['game_date', 'at_bat_number', 'pitch_number'], ascending=False).reset_index(drop=True)
+
+def make_pitcher_history(n_pitches=30000, pitcher_id=FOCUS_PITCHER_ID, focus_batter=FOCUS_BATTER_ID, focus_share=0.05, seed=0):
+    # 一位投手 9 個賽季的所有投球，其中 focus_share 比例面對指定打者
+    return make_pitches(n_pitches, pitcher_ids=(pitcher_id,), focus_batter=focus_batter, focus_share=focus_share, seed=seed)
+
+FIRST_NAMES = ['Aaron', 'Blake', 'Carlos', 'Dylan', 'Eli', 'Felix', 'Gavin', 'Hunter', 'Ian', 'Jose', 'Kyle', 'Luis', 'Max', 'Nolan', 'Oscar', 'Pete']
+LAST_NAMES = ['Alvarez', 'Bell', 'Castro', 'Diaz', 'Estrada', 'Flores', 'Garcia', 'Hernandez', 'Ito', 'Jones', 'Kim', 'Lopez', 'Martinez', 'Nunez', 'Ortiz', 'Perez', 'Ramos', 'Smith', 'Torres', 'Valdez']
+FOCUS_PITCHER_NAME = ('Gerrit', 'Cole')
+FOCUS_BATTER_NAME = ('Aaron', 'Judge')
+# 整排打線：指定打者 + 打者池前 8 位（給獨一無二的姓名，逐一以姓名查詢時不會撞名）
+LINEUP_NAMES = [('Mookie', 'Betts'), ('Freddie', 'Freeman'), ('Juan', 'Soto'), ('Rafael', 'Devers'), ('Bryce', 'Harper'), ('Corbin', 'Carroll'), ('Vladimir', 'Guerrero'), ('Bobby', 'Witt')]
+LINEUP_BATTER_IDS = [FOCUS_BATTER_ID] + [600000 + i for i in range(len(LINEUP_NAMES))]
+
+def make_register(n_players=20000, n_batters=400, seed=0):
+    # Chadwick register 格式的合成名冊；包含 make_pitches 產生的所有打者與兩位指定球員
+    rng = np.random.default_rng(seed)
+    mlbam = np.concatenate([[FOCUS_PITCHER_ID, FOCUS_BATTER_ID], 600000 + np.arange(n_batters), 400000 + np.arange(n_players)])
+    n = len(mlbam)
+    first = rng.choice(FIRST_NAMES, n).astype(object)
+    last = rng.choice(LAST_NAMES, n).astype(object)
+    first[:2], last[:2] = [FOCUS_PITCHER_NAME[0], FOCUS_BATTER_NAME[0]], [FOCUS_PITCHER_NAME[1], FOCUS_BATTER_NAME[1]]
+    lineup = slice(2, 2 + min(len(LINEUP_NAMES), n_batters))
+    first[lineup], last[lineup] = [f for f, _ in LINEUP_NAMES][:n_batters], [l for _, l in LINEUP_NAMES][:n_batters]
+    played_last = rng.integers(1990, 2026, n)
+    played_last[:2 + n_batters] = 2025
+    return pd.DataFrame({
+        'name_last': last,
+        'name_first': first,
+        'key_mlbam': mlbam,
+        'key_retro': None,
+        'key_bbref': None,
+        'key_fangraphs': 10000 + np.arange(n),
+        'mlb_played_first': played_last - rng.integers(0, 15, n),
+        'mlb_played_last': played_last,
+    })
+
+def make_league_stats(stat_type, register, n_players=1200, seed=0):
+    # FanGraphs pitching_stats / batting_stats 格式；包含名冊前兩位指定球員（投手 / 打者）
+    rng = np.random.default_rng(seed + (1 if stat_type == 'batting' else 0))
+    focus = register['key_fangraphs'].iloc[1 if stat_type == 'batting' else 0]
+    others = rng.choice(register['key_fangraphs'].iloc[2:].to_numpy(), n_players - 1, replace=False)
+    idfg = np.concatenate([[focus], others])
+    players = register.set_index('key_fangraphs').loc[idfg]
+    names = (players['name_first'] + ' ' + players['name_last']).to_numpy()
+    if stat_type == 'pitching':
+        ip = rng.gamma(2.0, 40.0, n_players).round(1)
+        return pd.DataFrame({
+            'IDfg': idfg, 'Name': names, 'W': rng.integers(0, 20, n_players), 'L': rng.integers(0, 15, n_players),
+            'ERA': rng.normal(4.2, 1.0, n_players).clip(0.5).round(2), 'SO': (ip * rng.normal(1.0, 0.2, n_players)).clip(0).astype(int),
+            'WHIP': rng.normal(1.3, 0.2, n_players).clip(0.6).round(2), 'IP': ip,
+            'K/9': rng.normal(8.8, 1.8, n_players).round(2), 'BB/9': rng.normal(3.2, 0.9, n_players).clip(0.5).round(2),
+            'GB%': [f"{v:.1f}%" for v in rng.normal(43, 6, n_players)],
+        })
+    if stat_type == 'batting':
+        obp, slg = rng.normal(0.315, 0.03, n_players).round(3), rng.normal(0.405, 0.06, n_players).round(3)
+        return pd.DataFrame({
+            'IDfg': idfg, 'Name': names, 'PA': rng.integers(1, 700, n_players), 'AVG': rng.normal(0.245, 0.03, n_players).round(3),
+            'HR': rng.integers(0, 45, n_players), 'RBI': rng.integers(0, 120, n_players), 'OBP': obp, 'SLG': slg, 'OPS': (obp + slg).round(3),
+            'BB/K': rng.normal(0.42, 0.15, n_players).clip(0.05).round(2), 'Spd': rng.normal(4.3, 1.5, n_players).clip(0.5).round(1),
+        })
+    raise ValueError(f"未知的數據類型: {stat_type}")
@@ -0,0 +1,41 @@
+# backend/benchmarks/harness.py
+# 效能腳本共用的環境設定與替身，避免各腳本各自複製而逐漸不一致：
+#   prepare_environment()  所有資料目錄都放在同一個新的暫存目錄；必須在匯入 main 之前呼叫
+#   install_registry()     以合成名冊作為已載入的球員名冊（不下載 Chadwick 名冊）
+#   disable_headshots()    頭像查詢不連網，一律回傳 None
+# 這個模組本身不匯入 main，腳本可以先匯入它再設定環境。
+
+import os
+import tempfile
+
+DATA_PATHS = [
+    ('STATCAST_STORE_DIR', 'statcast'),
+    ('HEADSHOT_CACHE_PATH', 'headshots.json'),
+    ('LEAGUE_STATS_DIR', 'league_stats'),
+    ('LEADERBOARD_DIR', 'leaderboards'),
+    ('PITCHER_PROFILE_DIR', 'pitcher_profiles'),
+    ('PLAYER_REGISTER_PATH', 'chadwick_register.parquet'),
+    ('PROFILE_DIR', 'profiles'),
+]
+
+def prepare_environment(prefix='statcast-bench-', offline=True):
+    # offline=False：儲存層會透過（由腳本取代的）下載函式補齊資料
+    directory = tempfile.mkdtemp(prefix=prefix)
+    os.environ['STATCAST_OFFLINE'] = '1' if offline else '0'
+    os.environ['LEADERBOARD_REFRESH_SECONDS'] = '0'
+    for name, path in DATA_PATHS:
+        os.environ[name] = os.path.join(directory, path)
+    return directory
+
+def install_registry(register):
+    import player_registry
+    registry = player_registry.PlayerRegistry(register)
+    player_registry._registry = registry
+    return registry
+
+def disable_headshots():
+    import main
+
+    async def no_headshot(player_id):
+        return None
+    main.headshot_resolver.resolve = no_headshot
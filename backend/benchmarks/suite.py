@@ -0,0 +1,254 @@
+# backend/benchmarks/suite.py
+# 可重現的離線效能測試：以合成 fixture 取代 pybaseball 的下載函式，透過 ASGI app 呼叫每個端點，
+# 記錄冷啟動延遲、暖快取的延遲百分位數與吞吐量、尖峰記憶體，並與保存的基準比較。
+#
+# 取代的資料來源（其餘程式碼路徑照常執行，包括本地 Statcast 儲存、名冊快照與各種快取）:
+#   statcast_store.statcast / statcast_pitcher   -> 一天的全聯盟投球 / 一位 9 個賽季的王牌投手
+#   leaderboard_store.statcast                   -> 一天的全聯盟投球
+#   league_cache.batting_stats / pitching_stats  -> FanGraphs 格式的全聯盟成績
+#   player_registry.chadwick_register            -> 合成名冊（playerid_lookup 已由本地名冊取代）
+#   headshot_resolver.resolve                    -> 不連網，一律回傳 None
+#
+# 執行方式（於 backend 目錄）:
+#   python -m benchmarks.suite                          # 預設規模，與 benchmarks/baseline.json 比較
+#   python -m benchmarks.suite --size small --only matchup leaderboards
+#   python -m benchmarks.suite --save-baseline          # 以這次結果作為新的基準
+#   python -m benchmarks.suite --fail-on-regression     # 任一端點退步超過容許值時結束代碼為 1
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, datetime
+
+from benchmarks import harness
+
+# 每次執行都從空的儲存開始；儲存層透過（已取代的）下載函式補齊資料
+harness.prepare_environment('statcast-suite-', offline=False)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import execution  # noqa: E402
+import leaderboard_store  # noqa: E402
+import league_cache  # noqa: E402
+import main  # noqa: E402
+import player_registry  # noqa: E402
+import statcast_store  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+from benchmarks.fixtures import FOCUS_PITCHER_ID, LINEUP_BATTER_IDS, make_league_stats, make_pitches, make_register  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = {
+    'small': {'ace_pitches': 8000, 'league_day_pitches': 1500, 'league_players': 400, 'register_players': 5000, 'requests': 20},
+    'default': {'ace_pitches': 30000, 'league_day_pitches': 4500, 'league_players': 1200, 'register_players': 20000, 'requests': 50},
+    'large': {'ace_pitches': 60000, 'league_day_pitches': 9000, 'league_players': 2000, 'register_players': 50000, 'requests': 100},
+}
+LEAGUE_PITCHERS = np.concatenate([[FOCUS_PITCHER_ID], 400000 + np.arange(300)])
+
+PITCHER, BATTER = 'Gerrit Cole', 'Aaron Judge'
+MATCHUP = {'pitcher': PITCHER, 'batter': BATTER}
+LINEUP = {'pitcher': PITCHER, 'batters': [BATTER] + [str(batter_id) for batter_id in LINEUP_BATTER_IDS[1:]]}
+# (名稱, 路徑, 查詢參數, 標頭)
+SCENARIOS = [
+    ('player-search', '/api/player-search', {'name': 'Col'}, None),
+    ('player-info', '/api/player-info', {'name': PITCHER}, None),
+    ('player-season-stats', '/api/player-season-stats', {'player_name': PITCHER}, None),
+    ('player-radar-stats', '/api/player-radar-stats', {'player_name': BATTER}, None),
+    ('player-radar-stats-batch', '/api/player-radar-stats/batch', {'names': [PITCHER, BATTER]}, None),
+    ('matchup', '/api/matchup', MATCHUP, None),
+    ('pvb-stats', '/api/pvb-stats', MATCHUP, None),
+    ('at-bat-timeline', '/api/at-bat-timeline', MATCHUP, None),
+    ('at-bat-timeline-page', '/api/at-bat-timeline', {**MATCHUP, 'limit': 20}, None),
+    ('at-bat-timeline-ndjson', '/api/at-bat-timeline', {**MATCHUP, 'stream': 'true'}, None),
+    ('outcome-simulator', '/api/outcome-simulator', MATCHUP, None),
+    ('lineup-matchup', '/api/lineup-matchup', LINEUP, None),
+    ('3d-trajectory', '/api/3d-trajectory', MATCHUP, None),
+    ('3d-trajectory-packed', '/api/3d-trajectory', {**MATCHUP, 'format': 'packed'}, None),
+    ('3d-trajectory-arrow', '/api/3d-trajectory', {**MATCHUP, 'format': 'arrow'}, None),
+    ('3d-trajectory-paths', '/api/3d-trajectory', {**MATCHUP, 'samples': 20, 'derived': 'true'}, None),
+    ('pitch-arsenal', '/api/pitch-arsenal', {'pitcher': PITCHER}, None),
+    ('pitch-strategy', '/api/pitch-strategy', {'pitcher_name': PITCHER, 'batter_name': BATTER}, None),
+    ('pitch-paths', '/api/pitch-paths', {'pitcher': PITCHER, 'derived': 'true'}, None),
+    ('leaderboards', '/api/leaderboards', {}, None),
+    ('cache-stats', '/api/cache-stats', {}, None),
+    ('metrics', '/metrics', {}, None),
+]
+
+class FixtureSource:
+    # 以固定亂數種子產生，相同規模的每次執行結果相同
+    def __init__(self, size):
+        self.size = size
+        year = date.today().year
+        self.history = make_pitches(size['ace_pitches'], seasons=range(year - 8, year + 1), focus_share=0.05)
+        self.register = make_register(size['register_players'])
+        self.league = {stat_type: make_league_stats(stat_type, self.register, size['league_players']) for stat_type in ('pitching', 'batting')}
+        self.calls = Counter()
+
+    def statcast_pitcher(self, start_dt, end_dt=None, player_id=None):
+        self.calls['statcast_pitcher'] += 1
+        dates = self.history['game_date']
+        frame = self.history[(dates >= pd.Timestamp(start_dt)) & (dates <= pd.Timestamp(end_dt or start_dt))]
+        return frame.assign(pitcher=int(player_id))
+
+    def statcast(self, start_dt=None, end_dt=None, verbose=0, **kwargs):
+        self.calls['statcast'] += 1
+        frames = [
+            make_pitches(self.size['league_day_pitches'], pitcher_ids=LEAGUE_PITCHERS, seasons=[day.year], seed=day.toordinal()).assign(game_date=day)
+            for day in pd.date_range(start_dt, end_dt or start_dt)
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def batting_stats(self, year, *args, **kwargs):
+        self.calls['batting_stats'] += 1
+        return self.league['batting'].copy()
+
+    def pitching_stats(self, year, *args, **kwargs):
+        self.calls['pitching_stats'] += 1
+        return self.league['pitching'].copy()
+
+    def chadwick_register(self, *args, **kwargs):
+        self.calls['chadwick_register'] += 1
+        return self.register.copy()
+
+def install_fixtures(source):
+    statcast_store.statcast, statcast_store.statcast_pitcher = source.statcast, source.statcast_pitcher
+    leaderboard_store.statcast = source.statcast
+    league_cache.batting_stats, league_cache.pitching_stats = source.batting_stats, source.pitching_stats
+    player_registry.chadwick_register = source.chadwick_register
+    harness.disable_headshots()
+
+def uncovered_routes():
+    # 新增端點後若忘了加入 SCENARIOS，這裡會提醒
+    covered = {path for _, path, _, _ in SCENARIOS}
+    routes = {getattr(route, 'path', '') for route in main.app.routes}
+    return sorted(path for path in routes if (path.startswith('/api/') or path == '/metrics') and path not in covered)
+
+async def measure(name, path, params, headers, requests, concurrency, memory_requests):
+    result = {}
+    started = time.perf_counter()
+    response = await request(main.app, path, params, headers=headers)
+    result['cold_ms'] = (time.perf_counter() - started) * 1000
+    result['status'] = response.status
+    result['bytes'] = len(response.body)
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests): queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            begin = time.perf_counter()
+            response = await request(main.app, path, params, headers=headers)
+            latencies.append(time.perf_counter() - begin)
+            if response.status >= 400: errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    samples = np.array(latencies) * 1000
+    result.update({
+        'p50_ms': float(np.percentile(samples, 50)), 'p95_ms': float(np.percentile(samples, 95)), 'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean()), 'throughput_rps': len(latencies) / elapsed if elapsed > 0 else float('inf'), 'errors': errors,
+    })
+
+    # 尖峰記憶體另外量測，避免 tracemalloc 的成本影響延遲數字（行程池中的計算不在量測範圍內）
+    if memory_requests:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        for _ in range(memory_requests):
+            await request(main.app, path, params, headers=headers)
+        result['peak_mem_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+def compare(results, baseline, tolerance):
+    if baseline['meta'].get('size') != results['meta']['size']:
+        print(f"注意：基準的規模為 {baseline['meta'].get('size')}，本次為 {results['meta']['size']}，比較結果僅供參考")
+    regressions = []
+    print(f"\n{'端點':<26}{'p50':>10}{'p95':>10}{'吞吐量':>10}{'記憶體':>10}")
+    for name, current in results['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            print(f"{name:<26}{'(新端點)':>10}")
+            continue
+        changes = {}
+        for metric in ('p50_ms', 'p95_ms', 'throughput_rps', 'peak_mem_kb'):
+            if previous.get(metric) and current.get(metric) is not None:
+                changes[metric] = current[metric] / previous[metric] - 1
+        cells = ''.join(f"{changes[m] * 100:>+9.1f}%" if m in changes else f"{'-':>10}" for m in ('p50_ms', 'p95_ms', 'throughput_rps', 'peak_mem_kb'))
+        print(f"{name:<26}{cells}")
+        if any(changes.get(m, 0) > tolerance for m in ('p50_ms', 'p95_ms', 'peak_mem_kb')) or changes.get('throughput_rps', 0) < -tolerance:
+            regressions.append(name)
+    return regressions
+
+async def run(args):
+    size = dict(SIZES[args.size])
+    requests = args.requests or size['requests']
+    source = FixtureSource(size)
+    install_fixtures(source)
+    missing = uncovered_routes()
+    if missing: print(f"注意：以下端點沒有測試情境: {', '.join(missing)}")
+
+    scenarios = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    endpoints = {}
+    print(f"{'端點':<26}{'狀態':>6}{'冷啟動 ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'記憶體 KB':>12}")
+    try:
+        for name, path, params, headers in scenarios:
+            result = await measure(name, path, params, headers, requests, args.concurrency, args.memory_requests)
+            endpoints[name] = result
+            print(f"{name:<26}{result['status']:>6}{result['cold_ms']:>12.1f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                  f"{result['throughput_rps']:>10.1f}{result.get('peak_mem_kb', float('nan')):>12.0f}")
+    finally:
+        execution.shutdown()
+    return {
+        'meta': {
+            'size': args.size, 'requests': requests, 'concurrency': args.concurrency, 'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__, 'platform': platform.platform(),
+            'upstream_calls': dict(source.calls),
+        },
+        'endpoints': endpoints,
+    }
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="後端端點的離線效能測試")
+    parser.add_argument('--size', choices=sorted(SIZES), default='default')
+    parser.add_argument('--requests', type=int, default=None, help="每個端點暖快取後的請求數（預設依規模）")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--memory-requests', type=int, default=3, help="量測尖峰記憶體的請求數，0 表示不量測")
+    parser.add_argument('--only', nargs='+', default=None, help="只執行指定名稱的情境")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output', default=None, help="另外把結果寫到指定的 JSON 檔")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="容許的退步比例（0.2 = 20%%）")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n已保存基準: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\n找不到基準 {args.baseline}，以 --save-baseline 建立")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n退步超過 {args.tolerance:.0%} 的端點: {', '.join(regressions)}")
+        if args.fail_on_regression: return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
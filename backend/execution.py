@@ -0,0 +1,132 @@
+# backend/execution.py
+# 把阻塞的 pybaseball 下載與 pandas 彙總移出 event loop：
+# - run_io: 有上限的執行緒池，給網路 / 磁碟 I/O（statcast、FanGraphs、Parquet 讀取）
+# - run_cpu: 行程池，給大型 pandas 彙總（小資料直接在目前執行緒計算，避免序列化成本）
+# - limited: 每個端點的同時執行數與排隊上限，滿載或逾時回傳 503
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+import telemetry
+
+IO_WORKERS = int(os.environ.get('IO_WORKERS', '16'))
+CPU_WORKERS = int(os.environ.get('CPU_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+# 資料列數少於此值時不送到行程池（pickle 成本大於計算本身）
+CPU_OFFLOAD_MIN_ROWS = int(os.environ.get('CPU_OFFLOAD_MIN_ROWS', '5000'))
+
+# 端點群組 -> (同時執行數, 排隊上限, 逾時秒數)
+ENDPOINT_LIMITS = {
+    'matchup': (8, 32, 60.0),
+    'pitcher-season': (4, 16, 60.0),
+    'league-stats': (4, 16, 45.0),
+    'leaderboards': (2, 16, 90.0),
+    'search': (32, 128, 10.0),
+}
+DEFAULT_LIMIT = (8, 32, 60.0)
+
+_io_pool = None
+_cpu_pool = None
+
+def _get_io_pool():
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='statcast-io')
+    return _io_pool
+
+def _get_cpu_pool():
+    global _cpu_pool
+    if _cpu_pool is None:
+        # 使用 spawn，避免在有多個執行緒的行程中 fork
+        _cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _cpu_pool
+
+def shutdown():
+    global _io_pool, _cpu_pool
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+
+async def _run(pool, fn, args, kwargs, timeout):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout) if timeout else await future
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="資料來源回應逾時，請稍後再試", headers={"Retry-After": "5"})
+
+async def run_io(fn, *args, timeout=None, stage='fetch', **kwargs):
+    # stage: 計入請求的哪個階段（見 telemetry.STAGES）
+    with telemetry.stage(stage):
+        return await _run(_get_io_pool(), fn, args, kwargs, timeout)
+
+async def run_cpu(fn, *args, rows=None, timeout=None, stage='aggregate', **kwargs):
+    with telemetry.stage(stage):
+        if rows is not None and rows < CPU_OFFLOAD_MIN_ROWS:
+            return fn(*args, **kwargs)
+        return await _run(_get_cpu_pool(), fn, args, kwargs, timeout)
+
+class EndpointLimiter:
+    def __init__(self, name, max_concurrency, max_queue, timeout):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(self, coro_fn, *args, **kwargs):
+        # 執行中 + 排隊中的請求超過上限時立即回 503，不讓請求無限堆積
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="伺服器忙碌中，請稍後再試", headers={"Retry-After": "2"})
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=503, detail="排隊等候逾時，請稍後再試", headers={"Retry-After": "5"})
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            return await asyncio.wait_for(coro_fn(*args, **kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=503, detail="請求處理逾時，請稍後再試", headers={"Retry-After": "5"})
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {"active": self.active, "waiting": self.waiting, "rejected": self.rejected, "timed_out": self.timed_out,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue, "timeout_seconds": self.timeout}
+
+_limiters = {}
+
+def get_limiter(name):
+    if name not in _limiters:
+        _limiters[name] = EndpointLimiter(name, *ENDPOINT_LIMITS.get(name, DEFAULT_LIMIT))
+    return _limiters[name]
+
+def limited(name):
+    # 端點裝飾器：@app.get(...) 之下使用，functools.wraps 保留參數簽章給 FastAPI
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            return await get_limiter(name).run(endpoint, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def stats():
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,146 @@
+# backend/headshots.py
+# 球員頭像網址解析：共用一個連線池化的 aiohttp session（在 app lifespan 中建立），
+# 結果依 MLBAM ID 持久化快取；找不到頭像 (404) 的球員做負向快取並設定到期時間，其他錯誤只短暫快取；
+# 同時進行的 HEAD 請求數有上限。
+
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+
+from telemetry import data_source
+
+HEADSHOT_BASE_URL = os.environ.get('HEADSHOT_BASE_URL', 'https://securea.mlb.com/mlb/images/players/head_shot')
+HEADSHOT_CACHE_PATH = os.environ.get('HEADSHOT_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'headshots.json'))
+HEADSHOT_NEGATIVE_TTL_SECONDS = float(os.environ.get('HEADSHOT_NEGATIVE_TTL_SECONDS', str(7 * 24 * 3600)))
+HEADSHOT_ERROR_TTL_SECONDS = 300  # 逾時 / 連線錯誤只短暫記住，稍後再試
+HEADSHOT_MAX_CONCURRENCY = int(os.environ.get('HEADSHOT_MAX_CONCURRENCY', '8'))
+HEADSHOT_TIMEOUT_SECONDS = float(os.environ.get('HEADSHOT_TIMEOUT_SECONDS', '5'))
+FLUSH_EVERY = 20
+
+class HeadshotResolver:
+    def __init__(self, base_url=HEADSHOT_BASE_URL, cache_path=HEADSHOT_CACHE_PATH, negative_ttl=HEADSHOT_NEGATIVE_TTL_SECONDS,
+                 max_concurrency=HEADSHOT_MAX_CONCURRENCY, timeout=HEADSHOT_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip('/')
+        self.cache_path = cache_path
+        self.negative_ttl = negative_ttl
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session = None
+        self._semaphore = None
+        self._urls = {}      # mlbam_id -> url
+        self._missing = {}   # mlbam_id -> 到期時間 (epoch 秒)
+        self._inflight = {}  # mlbam_id -> asyncio.Task
+        self._unsaved = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.requests = 0
+        self.errors = 0
+        self._load()
+
+    # --- 生命週期 ---
+    async def start(self):
+        if self._session is not None and not self._session.closed: return
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        self.save()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # --- 持久化 ---
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        self._urls = {int(k): v for k, v in data.get('urls', {}).items()}
+        self._missing = {int(k): v for k, v in data.get('missing', {}).items() if v > now}
+
+    def save(self):
+        if self.cache_path is None: return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"urls": self._urls, "missing": self._missing}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._unsaved = 0
+
+    def _record(self, player_id, url, ttl=None):
+        if url:
+            self._urls[player_id] = url
+            self._missing.pop(player_id, None)
+        else:
+            self._missing[player_id] = time.time() + (ttl or self.negative_ttl)
+        self._unsaved += 1
+        if self._unsaved >= FLUSH_EVERY:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"寫入頭像快取時出錯: {e}")
+
+    # --- 查詢 ---
+    async def _fetch(self, player_id):
+        if self._session is None or self._session.closed:
+            await self.start()
+        url = f"{self.base_url}/{player_id}.jpg"
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                with data_source('mlb-headshots'):
+                    async with self._session.head(url, allow_redirects=True) as response:
+                        status, resolved = response.status, str(response.url)
+                if status == 200:
+                    self._record(player_id, resolved)
+                    return resolved
+                if status == 404:
+                    self._record(player_id, None)
+                    return None
+                # 429 / 403 / 5xx 等暫時性狀態只短暫記住，避免一次限流或故障讓頭像消失一週
+                self.errors += 1
+                print(f"獲取頭像時收到 HTTP {status}: {url}")
+                self._record(player_id, None, ttl=HEADSHOT_ERROR_TTL_SECONDS)
+                return None
+            except Exception as e:
+                self.errors += 1
+                print(f"獲取頭像時發生錯誤: {e}")
+                self._record(player_id, None, ttl=HEADSHOT_ERROR_TTL_SECONDS)
+                return None
+
+    async def resolve(self, player_id):
+        player_id = int(player_id)
+        url = self._urls.get(player_id)
+        if url is not None:
+            self.hits += 1
+            return url
+        expires_at = self._missing.get(player_id)
+        if expires_at is not None:
+            if expires_at > time.time():
+                self.negative_hits += 1
+                return None
+            del self._missing[player_id]
+
+        # 同一位球員同時被多個請求查詢時只發一次 HEAD
+        task = self._inflight.get(player_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(player_id))
+            self._inflight[player_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(player_id, None))
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "cached_urls": len(self._urls),
+            "cached_missing": len(self._missing),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
@@ -0,0 +1,163 @@
+# backend/leaderboard_store.py
+# 每週排行榜的預先彙總：背景排程把每天的 Statcast 數據壓縮成一份小型每日摘要，
+# /api/leaderboards 只需要合併最近七天的摘要並取前幾名。
+#
+# 每日摘要內容：
+#   - 單一數值排行 (最快球速 / 最強擊球初速 / 最遠全壘打)：當天前 TOP_K 名 [player_id, value]
+#   - 累計排行 (三振 / 安打 / 全壘打)：當天每位球員的次數 [player_id, count]
+#
+# 手動更新: python leaderboard_store.py          (增量：只重算最新一天與缺少的日期)
+#           python leaderboard_store.py --full   (重算整週)
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from pybaseball import statcast
+
+from execution import run_io
+from statcast_store import compact_frame
+from telemetry import data_source
+
+LEADERBOARD_DIR = os.environ.get('LEADERBOARD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'leaderboards'))
+LEADERBOARD_REFRESH_SECONDS = float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', '1800'))
+WINDOW_DAYS = 7
+TOP_K = 5
+
+HIT_EVENTS = ['single', 'double', 'triple', 'home_run']
+# 名稱 -> (欄位, 球員欄位, 事件條件)
+MAX_METRICS = {
+    'fastest_pitch': ('release_speed', 'pitcher', None),
+    'hardest_hit': ('launch_speed', 'batter', None),
+    'longest_homerun': ('hit_distance_sc', 'batter', ['home_run']),
+}
+COUNT_METRICS = {
+    'strikeouts': ('pitcher', ['strikeout']),
+    'hits': ('batter', HIT_EVENTS),
+    'homeruns': ('batter', ['home_run']),
+}
+LEADERBOARD_COLUMNS = ['pitcher', 'batter', 'events', 'release_speed', 'launch_speed', 'hit_distance_sc']
+
+def _fetch_day(day):
+    day_str = day.isoformat()
+    print(f"正在彙總排行榜數據，日期: {day_str}")
+    with data_source('savant'):
+        df = statcast(start_dt=day_str, end_dt=day_str, verbose=0)
+    # 一天的全聯盟數據只保留摘要需要的欄位，並縮小型別
+    return compact_frame(df, LEADERBOARD_COLUMNS) if df is not None else None
+
+def summarize_day(day, df):
+    summary = {"date": day.isoformat(), "pitches": int(len(df))}
+    for name, (column, player_col, events) in MAX_METRICS.items():
+        if df.empty or column not in df.columns or player_col not in df.columns:
+            summary[name] = []
+            continue
+        subset = df[df['events'].isin(events)] if events else df
+        values = pd.to_numeric(subset[column], errors='coerce')
+        candidates = pd.DataFrame({'player': subset[player_col], 'value': values}).dropna()
+        top = candidates.nlargest(TOP_K, 'value')
+        summary[name] = [[int(p), round(float(v), 1)] for p, v in zip(top['player'], top['value'])]
+    for name, (player_col, events) in COUNT_METRICS.items():
+        if df.empty or player_col not in df.columns or 'events' not in df.columns:
+            summary[name] = []
+            continue
+        counts = df.loc[df['events'].isin(events), player_col].dropna().astype(int).value_counts()
+        summary[name] = [[int(p), int(c)] for p, c in counts.items()]
+    return summary
+
+def merge_summaries(summaries):
+    # 合併多天摘要：單一數值取最大值，累計排行先加總再取最大
+    merged = {}
+    for name in MAX_METRICS:
+        candidates = (entry for summary in summaries for entry in summary.get(name, []))
+        top = heapq.nlargest(1, candidates, key=lambda entry: entry[1])
+        merged[name] = tuple(top[0]) if top else None
+    for name in COUNT_METRICS:
+        totals = Counter()
+        for summary in summaries:
+            for player_id, count in summary.get(name, []):
+                totals[player_id] += count
+        top = heapq.nlargest(1, totals.items(), key=lambda item: item[1])
+        merged[name] = top[0] if top else None
+    return merged
+
+class LeaderboardMaterializer:
+    def __init__(self, directory=LEADERBOARD_DIR, fetch_day=_fetch_day):
+        self.directory = directory
+        self.fetch_day = fetch_day
+        self._summaries = {}  # date -> summary
+        self._lock = threading.Lock()            # 同一時間只有一個 refresh（會持有整段下載期間）
+        self._summaries_lock = threading.Lock()  # 只保護 _summaries 的讀寫；event loop 上的 week_summaries 也會用到
+        self.last_refresh = None
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{day.isoformat()}.json")
+
+    def _load(self, day):
+        with self._summaries_lock:
+            summary = self._summaries.get(day)
+        if summary is not None: return summary
+        try:
+            with open(self._path(day), 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        with self._summaries_lock:
+            return self._summaries.setdefault(day, summary)
+
+    def _save(self, day, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(day) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f)
+        os.replace(tmp_path, self._path(day))
+        with self._summaries_lock:
+            self._summaries[day] = summary
+
+    def window(self, today=None):
+        today = today or date.today()
+        return [today - timedelta(days=i) for i in range(1, WINDOW_DAYS + 1)]
+
+    def refresh(self, incremental=True, today=None):
+        # 增量模式只重算最新一天（可能尚未完整）、還沒有摘要的日期，以及摘要為空的日期
+        # （Savant 故障或延遲時下載到的空結果，不能在整週內都沿用）
+        days = self.window(today)
+        newest = days[0]
+        with self._lock:
+            for day in days:
+                if incremental and day != newest:
+                    summary = self._load(day)
+                    if summary is not None and summary.get('pitches', 0) > 0: continue
+                try:
+                    df = self.fetch_day(day)
+                except Exception as e:
+                    print(f"獲取 {day} 數據時出錯: {e}")
+                    continue
+                self._save(day, summarize_day(day, df if df is not None else pd.DataFrame()))
+            # 只在記憶體中保留視窗內的摘要
+            with self._summaries_lock:
+                self._summaries = {d: summary for d, summary in self._summaries.items() if d in days}
+            self.last_refresh = datetime.now()
+
+    def week_summaries(self, today=None):
+        return [summary for summary in (self._load(day) for day in self.window(today)) if summary is not None]
+
+    async def run_periodically(self, interval=LEADERBOARD_REFRESH_SECONDS):
+        while True:
+            try:
+                await run_io(self.refresh)
+            except Exception as e:
+                print(f"排行榜背景更新時出錯: {e}")
+            await asyncio.sleep(interval)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="更新每週排行榜的每日摘要")
+    parser.add_argument('--full', action='store_true', help="重算整週而不只是最新一天")
+    args = parser.parse_args()
+    LeaderboardMaterializer().refresh(incremental=not args.full)
@@ -0,0 +1,177 @@
+# backend/league_cache.py
+# FanGraphs 全聯盟數據快取（取代 lru_cache(maxsize=2)）
+# - 依 (投/打, 賽季) 分別快取，數量不限
+# - 每筆有 TTL：進行中的賽季較短，已結束的賽季很長
+# - 過期後先回傳舊資料，同時在背景重新下載 (stale-while-revalidate)
+# - 下載失敗不寫入快取，下一個請求會重試
+# - 以 Parquet 保存到磁碟，重新啟動後不用重新下載
+# - 統計各呼叫端（雷達圖 / 賽季成績）有多少請求必須等待 FanGraphs
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from pybaseball import batting_stats, pitching_stats
+
+from telemetry import data_source
+
+LEAGUE_STATS_DIR = os.environ.get('LEAGUE_STATS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'league_stats'))
+CURRENT_SEASON_TTL_SECONDS = float(os.environ.get('LEAGUE_STATS_TTL_SECONDS', str(6 * 3600)))
+PAST_SEASON_TTL_SECONDS = 30 * 24 * 3600
+STAT_TYPES = ('batting', 'pitching')
+
+def fetch_league_stats(stat_type, year):
+    print(f"正在下載 {year} 年全聯盟 {stat_type} 數據...")
+    if stat_type == 'batting':
+        with data_source('fangraphs'):
+            df = batting_stats(year)
+        if 'BB/K' not in df.columns: df['BB/K'] = df['BB'] / df['K']
+        if 'Spd' not in df.columns: df['Spd'] = 0
+        return df
+    if stat_type == 'pitching':
+        with data_source('fangraphs'):
+            df = pitching_stats(year)
+        if 'GB%' not in df.columns: df['GB%'] = '0%'
+        return df
+    raise ValueError(f"未知的數據類型: {stat_type}")
+
+class LeagueStatsCache:
+    def __init__(self, fetch=fetch_league_stats, directory=LEAGUE_STATS_DIR):
+        self.fetch = fetch
+        self.directory = directory
+        self._entries = {}        # (stat_type, year) -> (df, fetched_at)
+        self._key_locks = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='league-refresh')
+        self._listeners = []
+        self.hits = 0
+        self.stale_hits = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.failures = 0
+        self.refreshes = 0
+        self.callers = {}         # caller -> {"requests": n, "waits": n}
+
+    def ttl_for(self, year):
+        return CURRENT_SEASON_TTL_SECONDS if year >= datetime.now().year else PAST_SEASON_TTL_SECONDS
+
+    def on_refresh(self, listener):
+        # listener(stat_type, year, df) 在每次成功下載後呼叫（例如重建百分位索引）
+        self._listeners.append(listener)
+
+    # --- 持久化 ---
+    def _path(self, stat_type, year):
+        return os.path.join(self.directory, f"{stat_type}_{year}.parquet")
+
+    def _load_persisted(self, key):
+        path = self._path(*key)
+        if not os.path.exists(path): return None
+        try:
+            entry = (pd.read_parquet(path), os.path.getmtime(path))
+        except Exception as e:
+            print(f"讀取 {path} 時出錯: {e}")
+            return None
+        self._entries[key] = entry
+        return entry
+
+    def _persist(self, key, df):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # FanGraphs 的文字欄位可能混有數字，統一成字串才能寫入 Parquet
+            df = df.copy()
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].astype('string')
+            tmp_path = self._path(*key) + '.tmp'
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(*key))
+        except Exception as e:
+            print(f"保存 {key} 全聯盟數據時出錯: {e}")
+
+    # --- 下載 ---
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key):
+        try:
+            df = self.fetch(*key)
+        except Exception as e:
+            self.failures += 1
+            print(f"下載 {key[1]} 年 {key[0]} 數據時出錯: {e}")
+            return None
+        if df is None or df.empty:
+            self.failures += 1
+            return None
+        self._entries[key] = (df, time.time())
+        self.refreshes += 1
+        self._persist(key, df)
+        for listener in self._listeners:
+            try:
+                listener(key[0], key[1], df)
+            except Exception as e:
+                print(f"更新 {key} 的索引時出錯: {e}")
+        return df
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing: return
+            self._refreshing.add(key)
+
+        def task():
+            try:
+                self._refresh(key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        self._refresher.submit(task)
+
+    # --- 查詢 ---
+    def get(self, stat_type, year, caller='other'):
+        key = (stat_type, int(year))
+        caller_stats = self.callers.setdefault(caller, {"requests": 0, "waits": 0})
+        caller_stats["requests"] += 1
+
+        entry = self._entries.get(key) or self._load_persisted(key)
+        if entry is not None:
+            df, fetched_at = entry
+            if time.time() - fetched_at < self.ttl_for(key[1]):
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._refresh_in_background(key)
+            return df
+
+        # 完全沒有資料時只能等待下載；同一個 key 只有一個執行緒真的去下載
+        self.waits += 1
+        caller_stats["waits"] += 1
+        started = time.perf_counter()
+        try:
+            with self._key_lock(key):
+                entry = self._entries.get(key)
+                if entry is not None: return entry[0]
+                df = self._refresh(key)
+        finally:
+            self.wait_seconds += time.perf_counter() - started
+        return df if df is not None else pd.DataFrame()
+
+    def warm_up(self, year=None):
+        year = year or datetime.now().year
+        for stat_type in STAT_TYPES:
+            self.get(stat_type, year, caller='warm-up')
+
+    def stats(self):
+        return {
+            "entries": [f"{stat_type}_{year}" for stat_type, year in self._entries],
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "failures": self.failures,
+            "refreshes": self.refreshes,
+            "refreshing": len(self._refreshing),
+            "callers": self.callers,
+        }
@@ -0,0 +1,105 @@
+# backend/league_index.py
+# 雷達圖的聯盟百分位索引：每個 (賽季, 投/打, 指標) 預先排序一次合格球員的數值，
+# 查詢時以二分搜尋計算百分位（與 scipy.stats.percentileofscore 的 kind='rank' 相同），
+# 並快取已轉成數值的欄位（例如 GB% 字串只解析一次）。
+# 索引跟著 get_league_stats 回傳的 DataFrame 走：DataFrame 更新後會自動重建。
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# 雷達圖項目: (標籤, 欄位, 小數位數 / None 表示不四捨五入, 數值越低越好)
+RADAR_SPECS = {
+    'pitching': {
+        'type': 'pitcher',
+        'qualifier': ('IP', 40),
+        'metrics': [
+            ("三振 K/9", 'K/9', 2, False),
+            ("控球 BB/9", 'BB/9', 2, True),
+            ("壓制力 WHIP", 'WHIP', 2, True),
+            ("耐戰力 IP", 'IP', None, False),
+            ("滾地球率 GB%", 'GB%', None, False),
+        ],
+    },
+    'batting': {
+        'type': 'batter',
+        'qualifier': ('PA', 100),
+        'metrics': [
+            ("力量 SLG", 'SLG', 3, False),
+            ("紀律 BB/K", 'BB/K', 2, False),
+            ("技巧 AVG", 'AVG', 3, False),
+            ("上壘 OBP", 'OBP', 3, False),
+            ("速度 Spd", 'Spd', 1, False),
+        ],
+    },
+}
+
+def to_numeric_column(series):
+    # FanGraphs 的百分比欄位可能是 "45.2%" 這樣的字串
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str).str.rstrip('%')
+    return pd.to_numeric(series, errors='coerce')
+
+def percentile_of_sorted(sorted_values, value):
+    n = len(sorted_values)
+    if n == 0 or np.isnan(value): return 0
+    left = np.searchsorted(sorted_values, value, side='left')
+    right = np.searchsorted(sorted_values, value, side='right')
+    return int((left + right + (1 if right > left else 0)) * 50.0 / n)
+
+class PercentileIndex:
+    def __init__(self, stat_type, league_df):
+        spec = RADAR_SPECS[stat_type]
+        self.stat_type = stat_type
+        self.player_type = spec['type']
+        self.metrics = spec['metrics']
+        self.source = league_df
+        self.values = {}
+        self.sorted_values = {}
+        self._row_of = {}
+        if league_df.empty or 'IDfg' not in league_df.columns: return
+
+        for position, idfg in enumerate(league_df['IDfg'].to_numpy()):
+            if pd.notna(idfg): self._row_of.setdefault(int(idfg), position)
+        qualifier_col, threshold = spec['qualifier']
+        qualified = (to_numeric_column(league_df[qualifier_col]) >= threshold).to_numpy() if qualifier_col in league_df.columns else np.zeros(len(league_df), dtype=bool)
+        for _, metric, _, _ in self.metrics:
+            values = to_numeric_column(league_df[metric]).to_numpy(dtype=float) if metric in league_df.columns else np.full(len(league_df), np.nan)
+            self.values[metric] = values
+            self.sorted_values[metric] = np.sort(values[qualified & ~np.isnan(values)])
+
+    def __contains__(self, player_idfg):
+        return int(player_idfg) in self._row_of
+
+    def percentile(self, metric, value):
+        return percentile_of_sorted(self.sorted_values[metric], value)
+
+    def radar(self, player_idfg):
+        position = self._row_of.get(int(player_idfg))
+        if position is None: return None
+        data = []
+        for subject, metric, digits, lower_is_better in self.metrics:
+            value = float(self.values[metric][position])
+            if np.isnan(value): value = 0.0
+            percentile = self.percentile(metric, value)
+            data.append({
+                "subject": subject,
+                "player_value": round(value, digits) if digits is not None else value,
+                "percentile": 100 - percentile if lower_is_better else percentile,
+            })
+        return {"type": self.player_type, "data": data}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_percentile_index(stat_type, year, league_df):
+    key = (stat_type, year)
+    index = _indexes.get(key)
+    if index is None or index.source is not league_df:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None or index.source is not league_df:
+                index = PercentileIndex(stat_type, league_df)
+                _indexes[key] = index
+    return index
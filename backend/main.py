@@ -1,18 +1,55 @@
 # backend/main.py
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pybaseball import statcast_pitcher, playerid_lookup, pitching_stats, batting_stats, statcast_batter, statcast, playerid_reverse_lookup
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-import aiohttp
 import asyncio
-from functools import lru_cache
-from scipy.stats import percentileofscore
-import gc # 引入垃圾回收模組
-
-app = FastAPI()
+from functools import partial
+from statcast_store import covered_range, load_statcast_pitcher
+from matchup_cache import MatchupCache
+from matchup_panels import LINEUP_COLUMNS, LINEUP_PANELS, PANEL_COLUMNS, PANELS, TIMELINE_PAGE_SIZE, after_cursor, at_bat_page, compute_lineup_panels, compute_matchup_panels, decode_cursor, iter_timeline_ndjson, order_pitches, trajectory_frame, trajectory_points
+from trajectory_codec import MEDIA_TYPES, encode_chunks, negotiate_format
+from trajectory_physics import DEFAULT_SAMPLES, MAX_SAMPLES, PHYSICS_COLUMNS, PitchPathCache, pitch_paths, trajectory_records_with_paths
+from leaderboard_store import LEADERBOARD_REFRESH_SECONDS, LeaderboardMaterializer, merge_summaries
+from player_registry import get_player_registry, loaded_player_registry
+from headshots import HeadshotResolver
+import execution
+import telemetry
+from telemetry import TimedRoute, stage
+from execution import limited, run_cpu, run_io
+from league_index import get_percentile_index
+from league_cache import LeagueStatsCache
+from pitcher_profiles import PitcherProfileStore
+
+leaderboard_materializer = LeaderboardMaterializer()
+headshot_resolver = HeadshotResolver()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 啟動時先載入球員名冊，避免第一個請求等待建立索引
+    try:
+        await run_io(get_player_registry)
+    except Exception as e:
+        print(f"載入球員名冊時出錯: {e}")
+    await headshot_resolver.start()
+    # 背景預先載入本季全聯盟數據，並定期更新排行榜的每日摘要（LEADERBOARD_REFRESH_SECONDS=0 時停用）
+    background_tasks = [asyncio.create_task(run_io(league_stats_cache.warm_up))]
+    if LEADERBOARD_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(leaderboard_materializer.run_periodically(LEADERBOARD_REFRESH_SECONDS)))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await headshot_resolver.close()
+    execution.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+# 所有端點的序列化時間計入 serialize 階段；中介軟體負責總時間、各階段直方圖與 Server-Timing
+app.router.route_class = TimedRoute
+app.middleware("http")(telemetry.timing_middleware)
 
 # --- CORS 中介軟體設定 ---
 origins = [
@@ -26,100 +63,131 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Pitch-Count"],  # 二進位軌跡格式的投球數，跨來源的前端才讀得到
 )
 
 # --- 全域快取 ---
-@lru_cache(maxsize=2)
-def get_league_stats(stat_type: str, year: int):
-    print(f"快取未命中：正在下載 {year} 年全聯盟 {stat_type} 數據...")
-    try:
-        if stat_type == 'batting':
-            df = batting_stats(year)
-            if 'BB/K' not in df.columns: df['BB/K'] = df['BB'] / df['K']
-            if 'Spd' not in df.columns: df['Spd'] = 0
-            return df
-        elif stat_type == 'pitching':
-            df = pitching_stats(year)
-            if 'GB%' not in df.columns: df['GB%'] = '0%'
-            return df
-    except Exception as e:
-        print(f"下載 {year} 年 {stat_type} 數據時出錯: {e}")
-    return pd.DataFrame()
+MATCHUP_START_DATE, MATCHUP_END_DATE = '2017-01-01', '2025-12-31'
+MAX_BATCH_PLAYERS = 30
+MAX_TIMELINE_PAGE = 500
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+# 對決數據只讀取面板與 3D 軌跡取樣需要的欄位（記憶體中為 float32 / 整數 / 類別）
+MATCHUP_COLUMNS = list(dict.fromkeys(PANEL_COLUMNS + PHYSICS_COLUMNS))
+matchup_cache = MatchupCache()
+pitch_path_cache = PitchPathCache()
+pitcher_profiles = PitcherProfileStore()
+
+league_stats_cache = LeagueStatsCache()
+# 全聯盟數據更新後立即重建百分位索引，雷達圖請求不需要等待
+league_stats_cache.on_refresh(lambda stat_type, year, df: get_percentile_index(stat_type, year, df))
+
+def get_league_stats(stat_type: str, year: int, caller: str = 'other'):
+    return league_stats_cache.get(stat_type, year, caller)
 
 # --- 輔助函式 ---
 async def fetch_player_image(player_id: int):
-    url = f"https://securea.mlb.com/mlb/images/players/head_shot/{player_id}.jpg"
-    timeout = aiohttp.ClientTimeout(total=10)
-    try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.head(url, allow_redirects=True) as response:
-                if response.status == 200:
-                    return str(response.url)
-    except Exception as e:
-        print(f"獲取頭像時發生錯誤: {e}")
-    return None
+    return await headshot_resolver.resolve(player_id)
+
+async def get_registry():
+    # 名冊已載入時直接回傳；啟動時載入失敗的話，改在 I/O 執行緒池中重試（失敗後的冷卻時間見 player_registry），不阻塞 event loop
+    registry = loaded_player_registry()
+    return registry if registry is not None else await run_io(get_player_registry, stage='resolve')
 
-@lru_cache(maxsize=256)
-def get_player_lookup_sync(player_id: int):
+async def get_player_lookup(player_id: int):
     try:
-        df = playerid_reverse_lookup([player_id], key_type='mlbam')
-        if not df.empty:
-            return df.iloc[0].to_dict()
+        return (await get_registry()).by_mlbam(player_id)
     except Exception as e:
         print(f"透過 ID {player_id} 查詢姓名時出錯: {e}")
     return None
 
 async def get_player_info_by_id(player_id: int):
-    loop = asyncio.get_event_loop()
-    player_data = await loop.run_in_executor(None, get_player_lookup_sync, player_id)
+    player_data = await get_player_lookup(player_id)
     if player_data:
         image_url = await fetch_player_image(player_id)
         player_data['image_url'] = image_url
     return player_data
 
 async def get_player_info_by_name(name: str):
-    if not isinstance(name, str): name = str(name)
-    try:
-        last_name, first_name = '', ''
-        if ',' in name:
-            parts = name.split(',')
-            last_name, first_name = parts[0].strip(), parts[1].strip()
-        else:
-            parts = name.strip().split()
-            first_name = parts[0]
-            last_name = parts[-1] if len(parts) > 1 else ''
-        df = playerid_lookup(last_name, first_name, fuzzy=True)
-        if not df.empty:
-            player_data = df.iloc[0].copy()
-            if pd.notna(player_data['key_mlbam']):
-                mlbam_id = int(player_data['key_mlbam'])
-                image_url = await fetch_player_image(mlbam_id)
-                player_dict = player_data.to_dict()
-                player_dict['image_url'] = image_url
+    with stage('resolve'):
+        if not isinstance(name, str): name = str(name)
+        try:
+            last_name, first_name = '', ''
+            if ',' in name:
+                parts = name.split(',')
+                last_name, first_name = parts[0].strip(), parts[1].strip()
+            else:
+                parts = name.strip().split()
+                first_name = parts[0]
+                last_name = parts[-1] if len(parts) > 1 else ''
+            matches = (await get_registry()).lookup(last_name, first_name)
+            if matches:
+                player_dict = matches[0]
+                player_dict['image_url'] = await fetch_player_image(player_dict['key_mlbam'])
                 return player_dict
-    except Exception as e:
-        print(f"獲取球員資訊 '{name}' 時發生錯誤: {e}")
+        except Exception as e:
+            print(f"獲取球員資訊 '{name}' 時發生錯誤: {e}")
     return None
 
+async def resolve_matchup_players(pitcher: str, batter: str):
+    with stage('resolve'):
+        return await asyncio.gather(get_player_info_by_name(pitcher), get_player_info_by_name(batter))
+
+async def get_player_info(value: str):
+    # 名稱或 MLBAM ID（純數字）皆可
+    value = str(value).strip()
+    if value.isdigit():
+        with stage('resolve'):
+            return await get_player_info_by_id(int(value))
+    return await get_player_info_by_name(value)
+
+async def get_matchup_frame(pitcher_info, batter_info):
+    # 四個對決端點共用同一份已篩選的對戰數據（唯讀）
+    pitcher_id, batter_id = int(pitcher_info['key_mlbam']), int(batter_info['key_mlbam'])
+    key = (pitcher_id, batter_id, MATCHUP_START_DATE, MATCHUP_END_DATE)
+    loader = partial(run_io, load_statcast_pitcher, MATCHUP_START_DATE, MATCHUP_END_DATE, pitcher_id, batter_id=batter_id, columns=MATCHUP_COLUMNS)
+    return await matchup_cache.get_or_load(key, loader)
+
+async def get_lineup_frame(pitcher_info, batter_ids):
+    # 整排打線一次讀取：只讀指定打者的投球；同一份打線再次查詢時命中快取
+    pitcher_id = int(pitcher_info['key_mlbam'])
+    batter_ids = tuple(sorted(set(batter_ids)))
+    key = (pitcher_id, ('lineup',) + batter_ids, MATCHUP_START_DATE, MATCHUP_END_DATE)
+    loader = partial(run_io, load_statcast_pitcher, MATCHUP_START_DATE, MATCHUP_END_DATE, pitcher_id, batter_id=list(batter_ids), columns=LINEUP_COLUMNS)
+    return await matchup_cache.get_or_load(key, loader)
+
 # --- API 端點 ---
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    return {"matchup": matchup_cache.stats(), "headshots": headshot_resolver.stats(), "league_stats": league_stats_cache.stats(), "pitch_paths": pitch_path_cache.stats(), "pitcher_profiles": pitcher_profiles.stats(), "endpoints": execution.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Prometheus 文字格式：請求 / 階段 / 上游延遲直方圖，加上各端點群組與快取的即時數值
+    endpoints = execution.stats()
+    gauges = [
+        ("endpoint_active_requests", "Requests currently executing per endpoint group.", ('group',), [((name, ), s['active']) for name, s in endpoints.items()]),
+        ("endpoint_waiting_requests", "Requests queued per endpoint group.", ('group',), [((name, ), s['waiting']) for name, s in endpoints.items()]),
+        ("endpoint_rejected_requests", "Requests rejected with 503 per endpoint group.", ('group',), [((name, ), s['rejected'] + s['timed_out']) for name, s in endpoints.items()]),
+        ("matchup_cache_bytes", "Bytes held by the matchup frame cache.", (), [((), matchup_cache.stats().get('bytes', 0))]),
+    ]
+    return PlainTextResponse(telemetry.render_metrics(gauges), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/player-search")
+@limited('search')
 async def search_player(name: str):
     if not name or len(name) < 2: return []
     try:
-        df = playerid_lookup(name, fuzzy=True).dropna(subset=['key_mlbam']).copy()
-        if df.empty: return []
-        df['name_full'] = df['name_first'].str.title() + ' ' + df['name_last'].str.title()
-        
-        tasks = [fetch_player_image(int(row['key_mlbam'])) for _, row in df.head(7).iterrows()]
-        image_urls = await asyncio.gather(*tasks)
-        
-        results = [{'name': row['name_full'], 'id': int(row['key_mlbam']), 'image_url': url} for (_, row), url in zip(df.head(7).iterrows(), image_urls)]
-        return results
+        with stage('resolve'):
+            players = (await get_registry()).search(name, limit=7)
+            if not players: return []
+            image_urls = await asyncio.gather(*(fetch_player_image(player['key_mlbam']) for player in players))
+        return [{'name': f"{player['name_first']} {player['name_last']}".strip(), 'id': player['key_mlbam'], 'image_url': url} for player, url in zip(players, image_urls)]
     except Exception as e:
         print(f"搜尋球員時發生錯誤: {e}")
         return []
 
 @app.get("/api/player-season-stats")
+@limited('league-stats')
 async def get_player_season_stats(player_name: str):
     player_info = await get_player_info_by_name(player_name)
     if not player_info:
@@ -130,13 +198,13 @@ async def get_player_season_stats(player_name: str):
 
     if player_idfg and pd.notna(player_idfg):
         player_idfg = int(player_idfg)
-        pitch_stats_df = get_league_stats('pitching', current_year)
+        pitch_stats_df = await run_io(get_league_stats, 'pitching', current_year, 'season-stats')
         player_pitch_stats = pitch_stats_df[pitch_stats_df['IDfg'] == player_idfg]
         if not player_pitch_stats.empty:
             stats = player_pitch_stats.iloc[0]
             return { "type": "pitcher", "name": player_name, "W": int(stats.get('W', 0)), "L": int(stats.get('L', 0)), "ERA": stats.get('ERA'), "SO": int(stats.get('SO', 0)), "WHIP": stats.get('WHIP'), "IP": stats.get('IP'), "image_url": player_info.get('image_url') }
 
-        bat_stats_df = get_league_stats('batting', current_year)
+        bat_stats_df = await run_io(get_league_stats, 'batting', current_year, 'season-stats')
         player_bat_stats = bat_stats_df[bat_stats_df['IDfg'] == player_idfg]
         if not player_bat_stats.empty:
             stats = player_bat_stats.iloc[0]
@@ -144,179 +212,216 @@ async def get_player_season_stats(player_name: str):
     
     raise HTTPException(status_code=404, detail=f"在 FanGraphs 中找不到 {player_name} 在 {current_year} 賽季的數據")
 
+@app.get("/api/matchup")
+@limited('matchup')
+async def get_matchup(pitcher: str, batter: str, panels: str = ",".join(PANELS)):
+    requested = [p.strip() for p in panels.split(',') if p.strip()]
+    unknown = [p for p in requested if p not in PANELS]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"未知的面板: {', '.join(unknown)}，可用的面板為 {', '.join(PANELS)}")
+    pitcher_info, batter_info = await resolve_matchup_players(pitcher, batter)
+    if not pitcher_info or not batter_info: return {"error": "無效的球員姓名"}
+    try:
+        matchup_data = await get_matchup_frame(pitcher_info, batter_info)
+        return await run_cpu(compute_matchup_panels, matchup_data, pitcher, batter, panels=requested, rows=len(matchup_data))
+    except HTTPException: raise
+    except Exception as e: return {"error": str(e)}
+
 @app.get("/api/pvb-stats")
+@limited('matchup')
 async def get_pvb_stats_by_name(pitcher: str, batter: str):
-    pitcher_info = await get_player_info_by_name(pitcher)
-    batter_info = await get_player_info_by_name(batter)
+    pitcher_info, batter_info = await resolve_matchup_players(pitcher, batter)
     if not pitcher_info or not batter_info: return {"error": "無效的球員姓名"}
     try:
-        data = statcast_pitcher('2017-01-01', '2025-12-31', int(pitcher_info['key_mlbam']))
-        matchup_data = data[data['batter'] == int(batter_info['key_mlbam'])].copy()
-        if matchup_data.empty: return {"pitcher_name": pitcher, "batter_name": batter, "message": "這兩位球員之間沒有對戰數據"}
-        
-        final_events = matchup_data.loc[matchup_data.groupby(['game_date', 'at_bat_number'])['pitch_number'].idxmax()]
-        events = final_events['events'].dropna()
-        at_bats = events[~events.isin(['walk', 'hit_by_pitch', 'sac_fly', 'sac_bunt', 'intentional_walk'])].count()
-        hits = events[events.isin(['single', 'double', 'triple', 'home_run'])].count()
-        strikeouts = events.str.contains('strikeout').sum()
-        walks = events.str.contains('walk|hit_by_pitch').sum()
-        home_runs = events.str.contains('home_run').sum()
-        batting_average = hits / at_bats if at_bats > 0 else 0
-        
-        return { "pitcher_name": pitcher, "batter_name": batter, "total_pa": int(len(events)), "at_bats": int(at_bats), "hits": int(hits), "strikeouts": int(strikeouts), "walks": int(walks), "home_runs": int(home_runs), "batting_average": round(batting_average, 3) }
+        matchup_data = await get_matchup_frame(pitcher_info, batter_info)
+        return compute_matchup_panels(matchup_data, pitcher, batter, panels=('pvb',))['pvb']
+    except HTTPException: raise
     except Exception as e: return {"error": str(e)}
 
 @app.get("/api/at-bat-timeline")
-async def get_at_bat_timeline(pitcher: str, batter: str):
-    pitcher_info = await get_player_info_by_name(pitcher)
-    batter_info = await get_player_info_by_name(batter)
+@limited('matchup')
+async def get_at_bat_timeline(request: Request, pitcher: str, batter: str, cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_TIMELINE_PAGE), stream: bool = False):
+    # 不帶參數時維持原本的完整清單
+    # limit / cursor：游標分頁，回傳 {"items": [...], "next_cursor": "YYYY-MM-DD~打席序號" 或 null}
+    # stream=true 或 Accept: application/x-ndjson：以 NDJSON 逐塊送出（可搭配 cursor 從指定位置之後開始）
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"無效的游標: {cursor}")
+    pitcher_info, batter_info = await resolve_matchup_players(pitcher, batter)
     if not pitcher_info or not batter_info: return {"error": "無效的球員姓名"}
     try:
-        data = statcast_pitcher('2017-01-01', '2025-12-31', int(pitcher_info['key_mlbam']))
-        matchup_data = data[data['batter'] == int(batter_info['key_mlbam'])].copy()
-        if matchup_data.empty: return []
-        
-        matchup_data['game_date'] = pd.to_datetime(matchup_data['game_date'])
-        timeline = []
-        grouped = matchup_data.groupby(['game_date', 'at_bat_number'])
-        
-        for (game_date, at_bat_number), group in grouped:
-            pitches = group.sort_values(by='pitch_number').copy()
-            final_event = pitches['events'].dropna().iloc[-1] if not pitches['events'].dropna().empty else "進行中"
-            at_bat_details = { "game_date": game_date.strftime('%Y-%m-%d'), "at_bat_number": int(at_bat_number), "final_event": final_event, "pitches": pitches[['pitch_number', 'pitch_name', 'release_speed', 'description']].replace({np.nan: None}).to_dict(orient='records') }
-            timeline.append(at_bat_details)
-            
-        return sorted(timeline, key=lambda x: (x['game_date'], x['at_bat_number']), reverse=True)
+        matchup_data = await get_matchup_frame(pitcher_info, batter_info)
+        if stream or NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+            ordered = await run_cpu(order_pitches, matchup_data, rows=len(matchup_data))
+            return StreamingResponse(iter_timeline_ndjson(after_cursor(ordered, cursor)), media_type=NDJSON_MEDIA_TYPE)
+        if cursor or limit:
+            ordered = await run_cpu(order_pitches, matchup_data, rows=len(matchup_data))
+            return await run_cpu(at_bat_page, ordered, cursor, limit or TIMELINE_PAGE_SIZE, rows=len(ordered))
+        panels = await run_cpu(compute_matchup_panels, matchup_data, pitcher, batter, panels=('timeline',), rows=len(matchup_data))
+        return panels['timeline']
+    except HTTPException: raise
     except Exception as e: return {"error": str(e)}
 
 @app.get("/api/outcome-simulator")
+@limited('matchup')
 async def get_outcome_probabilities(pitcher: str, batter: str):
-    pitcher_info = await get_player_info_by_name(pitcher)
-    batter_info = await get_player_info_by_name(batter)
+    pitcher_info, batter_info = await resolve_matchup_players(pitcher, batter)
     if not pitcher_info or not batter_info: return {"error": "無效的球員姓名"}
     try:
-        data = statcast_pitcher('2017-01-01', '2025-12-31', int(pitcher_info['key_mlbam']))
-        matchup_data = data[data['batter'] == int(batter_info['key_mlbam'])].copy()
-        events = matchup_data.dropna(subset=['events'])
-        final_events = events.loc[events.groupby(['game_date', 'at_bat_number'])['pitch_number'].idxmax()]
-        if final_events.empty: return {"error": "沒有足夠的對戰數據來進行模擬"}
-        
-        total_pa = len(final_events)
-        outcomes = {
-            "Strikeout": final_events['events'].str.contains('strikeout').sum(),
-            "Walk": final_events['events'].str.contains('walk|hit_by_pitch').sum(),
-            "Single": final_events['events'].str.contains('single').sum(),
-            "Double": final_events['events'].str.contains('double').sum(),
-            "Triple": final_events['events'].str.contains('triple').sum(),
-            "Home Run": final_events['events'].str.contains('home_run').sum(),
-        }
-        hits_and_walks = sum(outcomes.values())
-        outcomes["Out"] = total_pa - hits_and_walks
-        probabilities = {key: round((value / total_pa) * 100, 1) for key, value in outcomes.items() if value > 0}
-        
-        return sorted(probabilities.items(), key=lambda item: item[1], reverse=True)
+        matchup_data = await get_matchup_frame(pitcher_info, batter_info)
+        return compute_matchup_panels(matchup_data, pitcher, batter, panels=('outcomes',))['outcomes']
+    except HTTPException: raise
+    except Exception as e: return {"error": str(e)}
+
+@app.get("/api/lineup-matchup")
+@limited('matchup')
+async def get_lineup_matchup(pitcher: str, batters: List[str] = Query(...), panels: str = ",".join(LINEUP_PANELS)):
+    # 一位投手對整排打線：batters 可重複帶入（名稱或 MLBAM ID），
+    # 投手數據只讀一次，所有打者的對戰摘要與結果機率在同一次分組計算中產生
+    if len(batters) > MAX_BATCH_PLAYERS:
+        raise HTTPException(status_code=400, detail=f"一次最多查詢 {MAX_BATCH_PLAYERS} 位球員")
+    requested = [p.strip() for p in panels.split(',') if p.strip()]
+    unknown = [p for p in requested if p not in LINEUP_PANELS]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"未知的面板: {', '.join(unknown)}，可用的面板為 {', '.join(LINEUP_PANELS)}")
+    with stage('resolve'):
+        pitcher_info, *batter_infos = await asyncio.gather(get_player_info(pitcher), *(get_player_info(batter) for batter in batters))
+    if not pitcher_info: return {"error": "無效的球員姓名"}
+    # 以 ID 查詢時回傳登錄資料中的姓名，以姓名查詢時沿用輸入的姓名（與單一對決端點相同）
+    pitcher_name = f"{pitcher_info['name_first']} {pitcher_info['name_last']}".strip() if pitcher.strip().isdigit() else pitcher
+    lineup = [(int(info['key_mlbam']), f"{info['name_first']} {info['name_last']}".strip() if batter.strip().isdigit() else batter)
+              for batter, info in zip(batters, batter_infos) if info]
+    try:
+        result = {"pitcher_name": pitcher_name, "batters": []}
+        if lineup:
+            lineup_data = await get_lineup_frame(pitcher_info, [batter_id for batter_id, _ in lineup])
+            result = await run_cpu(compute_lineup_panels, lineup_data, pitcher_name, lineup, panels=requested, rows=len(lineup_data))
+        # 依輸入順序排列，找不到的打者以錯誤訊息佔位
+        computed = iter(result['batters'])
+        result['batters'] = [next(computed) if info else {"batter_name": batter, "error": "找不到球員"} for batter, info in zip(batters, batter_infos)]
+        return result
+    except HTTPException: raise
     except Exception as e: return {"error": str(e)}
 
 @app.get("/api/pitch-arsenal")
+@limited('pitcher-season')
 async def get_pitch_arsenal(pitcher: str):
     pitcher_info = await get_player_info_by_name(pitcher)
     if not pitcher_info: return {"error": f"找不到投手 '{pitcher}' 的 ID"}
     try:
-        current_year = datetime.now().year
-        data = statcast_pitcher(f'{current_year}-01-01', f'{current_year}-12-31', int(pitcher_info['key_mlbam']))
-        data = data.dropna(subset=['pitch_name'])
-        data = data[data['pitch_name'] != '']
-        if data.empty: return []
-        
-        arsenal = data.groupby('pitch_name').agg( usage=('pitch_name', 'count'), avg_speed=('release_speed', 'mean'), max_speed=('release_speed', 'max'), avg_spin=('release_spin_rate', 'mean'), avg_pfx_x=('pfx_x', lambda x: x.mean() * 12), avg_pfx_z=('pfx_z', lambda x: x.mean() * 12) ).reset_index()
-        total_pitches = arsenal['usage'].sum()
-        arsenal['usage_percentage'] = (arsenal['usage'] / total_pitches) * 100
-        arsenal = arsenal.round(1).replace({np.nan: None})
-        
-        return arsenal.to_dict(orient='records')
+        profile = await run_io(pitcher_profiles.get, int(pitcher_info['key_mlbam']), datetime.now().year)
+        return profile['arsenal']['all']
+    except HTTPException: raise
     except Exception as e: return {"error": str(e)}
 
 @app.get("/api/3d-trajectory")
-async def get_3d_trajectory(pitcher: str, batter: str):
-    pitcher_info = await get_player_info_by_name(pitcher)
-    batter_info = await get_player_info_by_name(batter)
+@limited('matchup')
+async def get_3d_trajectory(request: Request, pitcher: str, batter: str, output: Optional[str] = Query(None, alias='format'), samples: int = Query(0, ge=0, le=MAX_SAMPLES), derived: bool = False):
+    # 預設回傳 JSON；?format=packed|arrow 或對應的 Accept 標頭則以欄式二進位格式分塊串流
+    # JSON 格式下 samples > 0 時每筆紀錄附上伺服器端計算的軌跡點（derived=true 另附飛行時間與位移）
+    try:
+        output_format = negotiate_format(output, request.headers.get('accept'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pitcher_info, batter_info = await resolve_matchup_players(pitcher, batter)
     if not pitcher_info or not batter_info: return {"error": "無效的球員姓名"}
     try:
-        data = statcast_pitcher('2017-01-01', '2025-12-31', int(pitcher_info['key_mlbam']))
-        matchup_data = data[data['batter'] == int(batter_info['key_mlbam'])].copy()
-        
-        required_columns = ['pitch_type', 'release_speed', 'release_pos_x', 'release_pos_y', 'release_pos_z', 'plate_x', 'plate_z', 'sz_top', 'sz_bot']
-        if matchup_data.empty or not all(col in matchup_data.columns for col in required_columns): return []
-        
-        trajectory_data = matchup_data[required_columns].dropna()
-        if trajectory_data.empty: return []
-        
-        return trajectory_data.to_dict(orient='records')
+        matchup_data = await get_matchup_frame(pitcher_info, batter_info)
+        if output_format == 'json':
+            if samples: return await run_cpu(trajectory_records_with_paths, matchup_data, samples, derived, rows=len(matchup_data))
+            return trajectory_points(matchup_data)
+        frame = trajectory_frame(matchup_data)
+        return StreamingResponse(encode_chunks(frame, output_format), media_type=MEDIA_TYPES[output_format], headers={"X-Pitch-Count": str(len(frame))})
+    except HTTPException: raise
     except Exception as e:
         print(f"取得 3D 軌跡數據時發生錯誤: {e}")
         return {"error": str(e)}
 
-@app.get("/api/player-radar-stats")
-async def get_player_radar_stats(player_name: str):
-    player_info = await get_player_info_by_name(player_name)
-    if not player_info: raise HTTPException(status_code=404, detail="找不到球員")
+def _paths_version(pitcher_id):
+    # 資料庫涵蓋的終點日期：寫入新比賽後改變，舊的快取鍵自然不再命中
+    covered = covered_range(pitcher_id)
+    return covered[1].isoformat() if covered else None
 
-    player_idfg = player_info.get('key_fangraphs')
-    if not player_idfg or not pd.notna(player_idfg): raise HTTPException(status_code=404, detail="找不到球員的 FanGraphs ID，無法計算百分位數")
+@app.get("/api/pitch-paths")
+@limited('pitcher-season')
+async def get_pitch_paths(pitcher: str, season: Optional[int] = None, samples: int = Query(DEFAULT_SAMPLES, ge=2, le=MAX_SAMPLES), derived: bool = False):
+    # 投手整季的取樣軌跡（欄式 JSON），依 (投手, 賽季, 取樣數, derived, 資料版本) 快取
+    pitcher_info = await get_player_info_by_name(pitcher)
+    if not pitcher_info: return {"error": f"找不到投手 '{pitcher}' 的 ID"}
+    try:
+        pitcher_id, season = int(pitcher_info['key_mlbam']), season or datetime.now().year
+        # 當季資料每天可能新增，鍵內加上日期確保至少每天重新檢查一次資料庫
+        key = (pitcher_id, season, samples, derived, await run_io(_paths_version, pitcher_id), datetime.now().date().isoformat())
+        payload = pitch_path_cache.get(key)
+        if payload is None:
+            data = await run_io(load_statcast_pitcher, f'{season}-01-01', f'{season}-12-31', pitcher_id, columns=PHYSICS_COLUMNS)
+            payload = await run_cpu(pitch_paths, data, samples, derived, rows=len(data))
+            payload = {"pitcher_id": pitcher_id, "season": season, **payload}
+            if not data.attrs.get('stale'): pitch_path_cache.put(key, payload)
+        return payload
+    except HTTPException: raise
+    except Exception as e:
+        print(f"計算投球軌跡時發生錯誤: {e}")
+        return {"error": str(e)}
 
-    player_idfg = int(player_idfg)
-    current_year = datetime.now().year
-    
-    pitch_stats_df = get_league_stats('pitching', current_year)
-    player_pitch_stats = pitch_stats_df[pitch_stats_df['IDfg'] == player_idfg] if not pitch_stats_df.empty else pd.DataFrame()
+def compute_radar_stats(player_idfgs, year):
+    # 先找投手再找打者；索引在聯盟數據更新時才會重建
+    indexes = [get_percentile_index(stat_type, year, get_league_stats(stat_type, year, 'radar')) for stat_type in ('pitching', 'batting')]
+    results = []
+    for player_idfg in player_idfgs:
+        radar = None
+        for index in indexes:
+            if player_idfg in index:
+                radar = index.radar(player_idfg)
+                break
+        results.append(radar)
+    return results
 
-    if not player_pitch_stats.empty:
-        stats = player_pitch_stats.iloc[0]
-        qualified_pitchers = pitch_stats_df[pitch_stats_df['IP'] >= 40]
-        
-        try:
-            gb_stat = stats['GB%']
-            if isinstance(gb_stat, str):
-                player_gb_value = float(gb_stat.rstrip('%'))
-            else:
-                player_gb_value = float(gb_stat)
-            qualified_gb_series = qualified_pitchers['GB%'].dropna().apply(lambda x: float(str(x).rstrip('%')))
-            gb_percentile = int(percentileofscore(qualified_gb_series, player_gb_value))
-        except (ValueError, TypeError) as e:
-            print(f"處理 GB% 時出錯: {e}")
-            player_gb_value, gb_percentile = 0, 0
-
-        radar_data = [
-            {"subject": "三振 K/9", "player_value": round(stats.get('K/9', 0), 2), "percentile": int(percentileofscore(qualified_pitchers['K/9'].dropna(), stats.get('K/9', 0)))},
-            {"subject": "控球 BB/9", "player_value": round(stats.get('BB/9', 0), 2), "percentile": 100 - int(percentileofscore(qualified_pitchers['BB/9'].dropna(), stats.get('BB/9', 0)))},
-            {"subject": "壓制力 WHIP", "player_value": round(stats.get('WHIP', 0), 2), "percentile": 100 - int(percentileofscore(qualified_pitchers['WHIP'].dropna(), stats.get('WHIP', 0)))},
-            {"subject": "耐戰力 IP", "player_value": stats.get('IP', 0), "percentile": int(percentileofscore(qualified_pitchers['IP'].dropna(), stats.get('IP', 0)))},
-            {"subject": "滾地球率 GB%", "player_value": player_gb_value, "percentile": gb_percentile},
-        ]
-        return {"type": "pitcher", "data": radar_data}
-
-    bat_stats_df = get_league_stats('batting', current_year)
-    player_bat_stats = bat_stats_df[bat_stats_df['IDfg'] == player_idfg] if not bat_stats_df.empty else pd.DataFrame()
-    
-    if not player_bat_stats.empty:
-        stats = player_bat_stats.iloc[0]
-        qualified_batters = bat_stats_df[bat_stats_df['PA'] >= 100]
+def _fangraphs_id(player_info):
+    player_idfg = player_info.get('key_fangraphs') if player_info else None
+    return int(player_idfg) if player_idfg is not None and pd.notna(player_idfg) else None
 
-        radar_data = [
-            {"subject": "力量 SLG", "player_value": round(stats.get('SLG', 0), 3), "percentile": int(percentileofscore(qualified_batters['SLG'].dropna(), stats.get('SLG', 0)))},
-            {"subject": "紀律 BB/K", "player_value": round(stats.get('BB/K', 0), 2), "percentile": int(percentileofscore(qualified_batters['BB/K'].dropna(), stats.get('BB/K', 0)))},
-            {"subject": "技巧 AVG", "player_value": round(stats.get('AVG', 0), 3), "percentile": int(percentileofscore(qualified_batters['AVG'].dropna(), stats.get('AVG', 0)))},
-            {"subject": "上壘 OBP", "player_value": round(stats.get('OBP', 0), 3), "percentile": int(percentileofscore(qualified_batters['OBP'].dropna(), stats.get('OBP', 0)))},
-            {"subject": "速度 Spd", "player_value": round(stats.get('Spd', 0), 1), "percentile": int(percentileofscore(qualified_batters['Spd'].dropna(), stats.get('Spd', 0)))},
-        ]
-        return {"type": "batter", "data": radar_data}
+@app.get("/api/player-radar-stats")
+@limited('league-stats')
+async def get_player_radar_stats(player_name: str):
+    player_info = await get_player_info_by_name(player_name)
+    if not player_info: raise HTTPException(status_code=404, detail="找不到球員")
 
-    raise HTTPException(status_code=404, detail="在投打數據中都找不到該球員")
+    player_idfg = _fangraphs_id(player_info)
+    if player_idfg is None: raise HTTPException(status_code=404, detail="找不到球員的 FanGraphs ID，無法計算百分位數")
+
+    radar, = await run_io(compute_radar_stats, [player_idfg], datetime.now().year, stage='aggregate')
+    if radar is None: raise HTTPException(status_code=404, detail="在投打數據中都找不到該球員")
+    return radar
+
+@app.get("/api/player-radar-stats/batch")
+@limited('league-stats')
+async def get_player_radar_stats_batch(names: List[str] = Query(...)):
+    if len(names) > MAX_BATCH_PLAYERS:
+        raise HTTPException(status_code=400, detail=f"一次最多查詢 {MAX_BATCH_PLAYERS} 位球員")
+    with stage('resolve'):
+        player_infos = await asyncio.gather(*(get_player_info_by_name(name) for name in names))
+    player_idfgs = [_fangraphs_id(info) for info in player_infos]
+    radars = await run_io(compute_radar_stats, [idfg for idfg in player_idfgs if idfg is not None], datetime.now().year, stage='aggregate')
+    radars = iter(radars)
+
+    results = []
+    for name, info, player_idfg in zip(names, player_infos, player_idfgs):
+        if not info:
+            results.append({"name": name, "error": "找不到球員"})
+        elif player_idfg is None:
+            results.append({"name": name, "error": "找不到球員的 FanGraphs ID，無法計算百分位數"})
+        else:
+            radar = next(radars)
+            results.append({"name": name, **radar} if radar else {"name": name, "error": "在投打數據中都找不到該球員"})
+    return {"results": results}
 
 @app.get("/api/pitch-strategy")
+@limited('pitcher-season')
 async def get_pitch_strategy(pitcher_name: str, batter_name: str):
-    pitcher_info = await get_player_info_by_name(pitcher_name)
-    batter_info = await get_player_info_by_name(batter_name)
+    pitcher_info, batter_info = await resolve_matchup_players(pitcher_name, batter_name)
     if not pitcher_info or not batter_info:
         raise HTTPException(status_code=404, detail="無效的球員姓名")
 
@@ -329,37 +434,25 @@ async def get_pitch_strategy(pitcher_name: str, batter_name: str):
             analysis_target = f"所有右打者" if batter_stance == 'R' else f"所有左打者"
             target_stance = batter_stance
 
-        current_year = datetime.now().year
-        data = statcast_pitcher(f'{current_year}-01-01', f'{current_year}-12-31', int(pitcher_info['key_mlbam']))
-
-        if target_stance:
-            strategy_data = data[data['stand'] == target_stance].copy()
-        else:
-            strategy_data = data.copy()
-
-        if strategy_data.empty:
+        profile = await run_io(pitcher_profiles.get, int(pitcher_info['key_mlbam']), datetime.now().year)
+        strategy = profile['strategy'][target_stance or 'all']
+        if not strategy['pitches']:
             return {"message": f"沒有足夠的數據來分析投手對 {analysis_target} 的策略"}
 
-        first_pitch_df = strategy_data[strategy_data['pitch_number'] == 1]
-        first_pitch_tendencies = (first_pitch_df['pitch_type'].value_counts(normalize=True) * 100).round(1).to_dict() if not first_pitch_df.empty else {}
-
-        two_strikes_df = strategy_data[strategy_data['strikes'] == 2]
-        two_strikes_tendencies = (two_strikes_df['pitch_type'].value_counts(normalize=True) * 100).round(1).to_dict() if not two_strikes_df.empty else {}
-
-        strikeout_pitches_df = strategy_data[strategy_data['events'] == 'strikeout']
-        strikeout_pitch = (strikeout_pitches_df['pitch_type'].value_counts(normalize=True) * 100).round(1).to_dict() if not strikeout_pitches_df.empty else {}
-
         return {
             "analysis_target": analysis_target,
-            "first_pitch": first_pitch_tendencies,
-            "two_strikes": two_strikes_tendencies,
-            "strikeout_pitch": strikeout_pitch,
+            "first_pitch": strategy['first_pitch'],
+            "two_strikes": strategy['two_strikes'],
+            "strikeout_pitch": strategy['strikeout_pitch'],
+            "by_count": strategy['by_count'],
         }
+    except HTTPException: raise
     except Exception as e:
         print(f"分析投球策略時發生錯誤: {e}")
         raise HTTPException(status_code=500, detail="分析投球策略時發生錯誤")
 
 @app.get("/api/player-info")
+@limited('search')
 async def get_player_basic_info(name: str):
     player_info = await get_player_info_by_name(name)
     if not player_info:
@@ -370,74 +463,43 @@ async def get_player_basic_info(name: str):
     }
 
 @app.get("/api/leaderboards")
+@limited('leaderboards')
 async def get_leaderboards():
     today = datetime.now()
-    data = pd.DataFrame()
-    message = ""
+    summaries = leaderboard_materializer.week_summaries(today.date())
+    if not summaries:
+        # 尚未有任何預先彙總（例如剛啟動），先同步建立一次
+        await run_io(leaderboard_materializer.refresh)
+        summaries = leaderboard_materializer.week_summaries(today.date())
 
-    for i in range(1, 8):
-        check_date = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-        print(f"正在嘗試獲取排行榜數據，日期: {check_date}")
-        try:
-            temp_data = statcast(start_dt=check_date, end_dt=check_date, verbose=0)
-            if not temp_data.empty:
-                data = pd.concat([data, temp_data])
-        except Exception as e:
-            print(f"獲取 {check_date} 數據時出錯: {e}")
-            continue
-
-    if data.empty:
+    if not any(summary.get('pitches') for summary in summaries):
         return {"message": "最近一週找不到任何比賽數據。"}
-    
+
     start_date = (today - timedelta(days=7)).strftime('%Y-%m-%d')
     end_date = today.strftime('%Y-%m-%d')
-    message = f"數據期間: {start_date} 至 {end_date}"
-    results = {"message": message}
-    
-    async def process_leaderboard_item(df, column, player_id_col, format_str, is_int=False, ascending=False):
-        if df.empty or column not in df.columns or player_id_col not in df.columns: return None
-        df_copy = df.copy()
-        df_copy[column] = pd.to_numeric(df_copy[column], errors='coerce')
-        df_copy.dropna(subset=[column, player_id_col], inplace=True)
-        if df_copy.empty: return None
-        
-        top_row = df_copy.sort_values(by=column, ascending=ascending).iloc[0]
-        player_id = int(top_row[player_id_col])
-        value = top_row[column]
-        
-        player_info = await get_player_info_by_id(player_id)
-        
+    results = {"message": f"數據期間: {start_date} 至 {end_date}"}
+
+    merged = merge_summaries(summaries)
+    # 回應欄位 -> (摘要名稱, 顯示格式, 是否轉為整數)
+    categories = {
+        "fastest_pitch": ('fastest_pitch', "{value:.1f} mph", False),
+        "most_strikeouts": ('strikeouts', "{value} K's", True),
+        "hardest_hit": ('hardest_hit', "{value:.1f} mph", False),
+        "longest_homerun": ('longest_homerun', "{value} ft", True),
+        "most_hits": ('hits', "{value} Hits", True),
+        "most_homeruns": ('homeruns', "{value} HR", True),
+    }
+
+    async def build_item(top, format_str, is_int):
+        if top is None: return None
+        player_id, value = top
+        player_info = await get_player_info_by_id(int(player_id))
         return {
             "player_name": f"{player_info['name_first']} {player_info['name_last']}" if player_info else "Unknown",
             "value": format_str.format(value=int(value) if is_int else value),
             "image_url": player_info.get('image_url') if player_info else None
         }
-        
-    async def process_agg_leaderboard_item(df, group_by_col, agg_col, agg_func, format_str):
-        if df.empty or group_by_col not in df.columns or agg_col not in df.columns: return None
-        agg_data = df.groupby(group_by_col)[agg_col].agg(agg_func).reset_index()
-        if agg_data.empty: return None
-        top_row = agg_data.sort_values(by=agg_col, ascending=False).iloc[0]
-        player_id = int(top_row[group_by_col])
-        player_info = await get_player_info_by_id(player_id)
-        return {
-            "player_name": f"{player_info['name_first']} {player_info['name_last']}" if player_info else "Unknown",
-            "value": format_str.format(value=top_row[agg_col]),
-            "image_url": player_info.get('image_url') if player_info else None
-        }
-
-    # 投手數據
-    results["fastest_pitch"] = await process_leaderboard_item(data, 'release_speed', 'pitcher', "{value:.1f} mph")
-    strikeouts_df = data[data['events'] == 'strikeout']
-    results["most_strikeouts"] = await process_agg_leaderboard_item(strikeouts_df, 'pitcher', 'events', 'count', "{value} K's")
-
-    # 打者數據
-    batted_balls = data.dropna(subset=['launch_speed', 'batter'])
-    results["hardest_hit"] = await process_leaderboard_item(batted_balls, 'launch_speed', 'batter', "{value:.1f} mph")
-    results["longest_homerun"] = await process_leaderboard_item(data[data['events'] == 'home_run'], 'hit_distance_sc', 'batter', "{value} ft", is_int=True)
-    hits_df = data[data['events'].isin(['single', 'double', 'triple', 'home_run'])]
-    results["most_hits"] = await process_agg_leaderboard_item(hits_df, 'batter', 'events', 'count', "{value} Hits")
-    hr_df = data[data['events'] == 'home_run']
-    results["most_homeruns"] = await process_agg_leaderboard_item(hr_df, 'batter', 'events', 'count', "{value} HR")
 
+    items = await asyncio.gather(*(build_item(merged[name], format_str, is_int) for name, format_str, is_int in categories.values()))
+    results.update(zip(categories.keys(), items))
     return results
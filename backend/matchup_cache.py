@@ -0,0 +1,115 @@
+# backend/matchup_cache.py
+# 投打對決數據的行程內快取：依 (投手, 打者, 日期區間) 快取已篩選好的 DataFrame
+# - 以位元組數為上限的 LRU 淘汰
+# - 每筆有 TTL
+# - 同一個 key 的並行請求只會觸發一次載入（其餘請求等待同一個結果）
+# 快取中的 DataFrame 由多個端點共用，呼叫端不可就地修改。
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+MATCHUP_CACHE_MAX_BYTES = int(float(os.environ.get('MATCHUP_CACHE_MAX_MB', '256')) * 1024 * 1024)
+MATCHUP_CACHE_TTL_SECONDS = float(os.environ.get('MATCHUP_CACHE_TTL_SECONDS', '3600'))
+
+def frame_nbytes(frame):
+    if isinstance(frame, pd.DataFrame):
+        return int(frame.memory_usage(deep=True).sum())
+    return 0
+
+class MatchupCache:
+    def __init__(self, max_bytes=MATCHUP_CACHE_MAX_BYTES, ttl_seconds=MATCHUP_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (frame, nbytes, expires_at)
+        self._inflight = {}            # key -> asyncio.Task
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None: return None
+        frame, nbytes, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return frame
+
+    def _remove(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def _store(self, key, frame):
+        # 上游同步失敗時讀到的舊數據只給這次的請求使用（見 statcast_store.load_statcast_pitcher）
+        if getattr(frame, 'attrs', {}).get('stale'): return
+        nbytes = frame_nbytes(frame)
+        if nbytes > self.max_bytes: return  # 單筆超過上限則不快取
+        if key in self._entries: self._remove(key)
+        self._entries[key] = (frame, nbytes, time.monotonic() + self.ttl_seconds)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def _load(self, key, loader):
+        try:
+            frame = await loader()
+            self._store(key, frame)
+            return frame
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _consume_exception(task):
+        # 所有等待者都已取消時，避免出現「例外未被取用」的警告
+        if not task.cancelled(): task.exception()
+
+    async def get_or_load(self, key, loader):
+        # loader 是回傳 DataFrame 的 coroutine function（由呼叫端決定在哪個執行緒池載入）
+        frame = self._lookup(key)
+        if frame is not None:
+            self.hits += 1
+            return frame
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # 載入在獨立的 task 中執行：任何一個呼叫端被取消（例如逾時）都不會取消共用的載入，
+            # 其他等待者照常拿到結果，載入完成後仍寫入快取
+            task = asyncio.ensure_future(self._load(key, loader))
+            task.add_done_callback(self._consume_exception)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    def invalidate(self, pitcher_id=None):
+        keys = [k for k in self._entries if pitcher_id is None or k[0] == pitcher_id]
+        for key in keys: self._remove(key)
+        return len(keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,215 @@
+# backend/matchup_panels.py
+# 投打對決各面板的計算（對戰摘要、結果機率、打席時間軸、3D 軌跡點）
+# 所有面板共用同一次排序與「每打席最終結果」的計算，時間軸以向量化方式切分，
+# 不再對每個打席做 sort_values / copy / to_dict。
+# 時間軸另提供游標分頁 (at_bat_page) 與分塊產生 (iter_at_bats) 給串流回應使用。
+# 整排打線 (compute_lineup_panels) 同樣只排序一次，再以打者分組加總結果旗標。
+
+import json
+
+import numpy as np
+import pandas as pd
+
+PANELS = ('pvb', 'outcomes', 'timeline', 'trajectory')
+
+PA_KEYS = ['game_date', 'at_bat_number']
+NON_AT_BAT_EVENTS = ['walk', 'hit_by_pitch', 'sac_fly', 'sac_bunt', 'intentional_walk']
+HIT_EVENTS = ['single', 'double', 'triple', 'home_run']
+TIMELINE_PITCH_COLUMNS = ['pitch_number', 'pitch_name', 'release_speed', 'description']
+TIMELINE_PAGE_SIZE = 50
+TIMELINE_CHUNK_AT_BATS = 256
+TRAJECTORY_COLUMNS = ['pitch_type', 'release_speed', 'release_pos_x', 'release_pos_y', 'release_pos_z', 'plate_x', 'plate_z', 'sz_top', 'sz_bot']
+# 對決面板需要從儲存讀取的欄位（3D 軌跡取樣另需 trajectory_physics.PHYSICS_COLUMNS）
+PANEL_COLUMNS = list(dict.fromkeys(PA_KEYS + ['pitch_number', 'events'] + TIMELINE_PITCH_COLUMNS + TRAJECTORY_COLUMNS))
+# 整排打線只需要摘要與結果機率，另需以打者分組
+LINEUP_PANELS = ('pvb', 'outcomes')
+LINEUP_COLUMNS = PA_KEYS + ['pitch_number', 'events', 'batter']
+# 記憶體中的 float32 轉回 JSON 時四捨五入到這個位數，還原 Statcast 原本的小數
+JSON_FLOAT_DIGITS = 4
+
+def json_records(frame):
+    # float32 先轉回 float64 並四捨五入（避免輸出 94.19999694824219），類別與可為空的整數轉為 Python 值，缺值為 None
+    columns = {}
+    for col in frame.columns:
+        series = frame[col]
+        if series.dtype == np.float32:
+            series = series.astype(np.float64).round(JSON_FLOAT_DIGITS)
+        columns[col] = series.astype(object).where(series.notna(), None)
+    return pd.DataFrame(columns, index=frame.index).to_dict(orient='records')
+
+def order_pitches(matchup_data):
+    # 打席由新到舊，打席內依球數由小到大（即時間軸的呈現順序）
+    ordered = matchup_data.assign(game_date=pd.to_datetime(matchup_data['game_date']))
+    return ordered.sort_values(PA_KEYS + ['pitch_number'], ascending=[False, False, True], kind='mergesort')
+
+def final_events(ordered):
+    # 每個打席最後一個有結果 (events) 的投球
+    with_events = ordered[ordered['events'].notna()]
+    return with_events.drop_duplicates(subset=PA_KEYS, keep='last')
+
+# 最終結果的計數旗標：對戰摘要、結果機率與整排打線的分組加總共用同一套判斷
+def event_flags(events):
+    return pd.DataFrame({
+        'at_bats': ~events.isin(NON_AT_BAT_EVENTS),
+        'hits': events.isin(HIT_EVENTS),
+        'strikeouts': events.str.contains('strikeout'),
+        'walks': events.str.contains('walk|hit_by_pitch'),
+        'singles': events.str.contains('single'),
+        'doubles': events.str.contains('double'),
+        'triples': events.str.contains('triple'),
+        'home_runs': events.str.contains('home_run'),
+    }, index=events.index).astype(np.int64)
+
+OUTCOME_FLAGS = {"Strikeout": 'strikeouts', "Walk": 'walks', "Single": 'singles', "Double": 'doubles', "Triple": 'triples', "Home Run": 'home_runs'}
+
+def summary_from_counts(counts, total_pa, pitcher, batter):
+    at_bats, hits = int(counts['at_bats']), int(counts['hits'])
+    batting_average = hits / at_bats if at_bats > 0 else 0
+    return { "pitcher_name": pitcher, "batter_name": batter, "total_pa": int(total_pa), "at_bats": at_bats, "hits": hits, "strikeouts": int(counts['strikeouts']), "walks": int(counts['walks']), "home_runs": int(counts['home_runs']), "batting_average": round(batting_average, 3) }
+
+def probabilities_from_counts(counts, total_pa):
+    if total_pa == 0: return None
+    outcomes = {label: int(counts[flag]) for label, flag in OUTCOME_FLAGS.items()}
+    outcomes["Out"] = total_pa - sum(outcomes.values())
+    probabilities = {key: round((value / total_pa) * 100, 1) for key, value in outcomes.items() if value > 0}
+    return sorted(probabilities.items(), key=lambda item: item[1], reverse=True)
+
+def pvb_summary(final, pitcher, batter):
+    return summary_from_counts(event_flags(final['events']).sum(), len(final), pitcher, batter)
+
+def outcome_counts(events):
+    counts = event_flags(events).sum()
+    return {label: int(counts[flag]) for label, flag in OUTCOME_FLAGS.items()}
+
+def outcome_probabilities(final):
+    return probabilities_from_counts(event_flags(final['events']).sum(), len(final))
+
+def at_bat_bounds(ordered):
+    # 每個打席在排序後的起點與終點（不含）
+    dates = ordered['game_date'].to_numpy()
+    at_bat_numbers = ordered['at_bat_number'].to_numpy()
+    is_start = np.ones(len(ordered), dtype=bool)
+    is_start[1:] = (dates[1:] != dates[:-1]) | (at_bat_numbers[1:] != at_bat_numbers[:-1])
+    starts = np.flatnonzero(is_start)
+    return starts, np.append(starts[1:], len(ordered))
+
+def _build_at_bats(block, starts, ends):
+    # 整個區塊只做一次 to_dict，再依邊界切片
+    pa_ids = np.repeat(np.arange(len(starts)), ends - starts)
+    last_events = block['events'].astype(object).groupby(pa_ids, sort=False).last().reindex(range(len(starts))).fillna("進行中").tolist()
+    date_strings = block['game_date'].iloc[starts].dt.strftime('%Y-%m-%d').tolist()
+    at_bat_numbers = block['at_bat_number'].to_numpy()
+    pitches = json_records(block[TIMELINE_PITCH_COLUMNS])
+    return [
+        { "game_date": game_date, "at_bat_number": int(at_bat_numbers[start]), "final_event": final_event, "pitches": pitches[start:end] }
+        for game_date, start, end, final_event in zip(date_strings, starts, ends, last_events)
+    ]
+
+def iter_at_bats(ordered, chunk_size=TIMELINE_CHUNK_AT_BATS):
+    # 每次只把 chunk_size 個打席轉成 dict，串流時記憶體用量與對戰總長度無關
+    if ordered.empty: return
+    starts, ends = at_bat_bounds(ordered)
+    for first in range(0, len(starts), chunk_size):
+        block_starts, block_ends = starts[first:first + chunk_size], ends[first:first + chunk_size]
+        offset = block_starts[0]
+        yield from _build_at_bats(ordered.iloc[offset:block_ends[-1]], block_starts - offset, block_ends - offset)
+
+def at_bat_timeline(ordered):
+    if ordered.empty: return []
+    return list(iter_at_bats(ordered, chunk_size=len(ordered)))
+
+def encode_cursor(game_date, at_bat_number):
+    return f"{game_date}~{int(at_bat_number)}"
+
+def decode_cursor(cursor):
+    # 格式錯誤時拋出 ValueError
+    game_date, at_bat_number = cursor.rsplit('~', 1)
+    return pd.Timestamp(game_date), int(at_bat_number)
+
+def after_cursor(ordered, cursor):
+    # 時間軸由新到舊，下一頁為 (日期, 打席序號) 嚴格小於游標的打席
+    if not cursor: return ordered
+    game_date, at_bat_number = decode_cursor(cursor)
+    dates = ordered['game_date']
+    return ordered[(dates < game_date) | ((dates == game_date) & (ordered['at_bat_number'] < at_bat_number))]
+
+def at_bat_page(ordered, cursor=None, limit=TIMELINE_PAGE_SIZE):
+    ordered = after_cursor(ordered, cursor)
+    if ordered.empty: return {"items": [], "next_cursor": None}
+    starts, ends = at_bat_bounds(ordered)
+    count = min(limit, len(starts))
+    items = _build_at_bats(ordered.iloc[:ends[count - 1]], starts[:count], ends[:count])
+    next_cursor = encode_cursor(items[-1]['game_date'], items[-1]['at_bat_number']) if len(starts) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+def _json_default(value):
+    if isinstance(value, np.generic): return value.item()
+    if value is pd.NA: return None
+    return str(value)
+
+def iter_timeline_ndjson(ordered, chunk_size=TIMELINE_CHUNK_AT_BATS):
+    # NDJSON：每行一個打席，每處理完一個區塊就送出
+    lines = []
+    for at_bat in iter_at_bats(ordered, chunk_size):
+        lines.append(json.dumps(at_bat, ensure_ascii=False, default=_json_default))
+        if len(lines) >= chunk_size:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines: yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+def trajectory_frame(matchup_data):
+    if matchup_data.empty or not all(col in matchup_data.columns for col in TRAJECTORY_COLUMNS):
+        return pd.DataFrame(columns=TRAJECTORY_COLUMNS)
+    return matchup_data[TRAJECTORY_COLUMNS].dropna()
+
+def trajectory_points(matchup_data):
+    trajectory_data = trajectory_frame(matchup_data)
+    if trajectory_data.empty: return []
+    return json_records(trajectory_data)
+
+def compute_matchup_panels(matchup_data, pitcher, batter, panels=PANELS):
+    # 一次排序、一次找出最終結果，再產生要求的面板
+    result = {"pitcher_name": pitcher, "batter_name": batter}
+    if matchup_data.empty:
+        empty = { "pvb": { "pitcher_name": pitcher, "batter_name": batter, "message": "這兩位球員之間沒有對戰數據" }, "outcomes": {"error": "沒有足夠的對戰數據來進行模擬"}, "timeline": [], "trajectory": [] }
+        result.update({panel: empty[panel] for panel in panels})
+        return result
+
+    ordered = order_pitches(matchup_data)
+    final = final_events(ordered) if ('pvb' in panels or 'outcomes' in panels) else None
+    if 'pvb' in panels:
+        result['pvb'] = pvb_summary(final, pitcher, batter)
+    if 'outcomes' in panels:
+        result['outcomes'] = outcome_probabilities(final) or {"error": "沒有足夠的對戰數據來進行模擬"}
+    if 'timeline' in panels:
+        result['timeline'] = at_bat_timeline(ordered)
+    if 'trajectory' in panels:
+        result['trajectory'] = trajectory_points(matchup_data)
+    return result
+
+def compute_lineup_panels(pitcher_data, pitcher, batters, panels=LINEUP_PANELS):
+    # batters: [(MLBAM ID, 打者名稱), ...]；投手數據只排序、找最終結果一次，再依打者分組加總
+    ids = [int(batter_id) for batter_id, _ in batters]
+    subset = pitcher_data[pitcher_data['batter'].isin(ids)]
+    final = final_events(order_pitches(subset))
+    keys = final['batter'].to_numpy()
+    counts = event_flags(final['events']).groupby(keys).sum()
+    totals = pd.Series(keys, dtype=np.int64).value_counts()
+    faced = set(subset['batter'].unique().tolist())
+
+    results = []
+    for batter_id, batter in batters:
+        entry = {"batter_id": int(batter_id), "batter_name": batter}
+        if int(batter_id) not in faced:
+            empty = { "pvb": { "pitcher_name": pitcher, "batter_name": batter, "message": "這兩位球員之間沒有對戰數據" }, "outcomes": {"error": "沒有足夠的對戰數據來進行模擬"} }
+            entry.update({panel: empty[panel] for panel in panels})
+            results.append(entry)
+            continue
+        total_pa = int(totals.get(int(batter_id), 0))
+        row = counts.loc[int(batter_id)] if total_pa else pd.Series(0, index=counts.columns)
+        if 'pvb' in panels:
+            entry['pvb'] = summary_from_counts(row, total_pa, pitcher, batter)
+        if 'outcomes' in panels:
+            entry['outcomes'] = probabilities_from_counts(row, total_pa) or {"error": "沒有足夠的對戰數據來進行模擬"}
+        results.append(entry)
+    return {"pitcher_name": pitcher, "batters": results}
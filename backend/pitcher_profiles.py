@@ -0,0 +1,175 @@
+# backend/pitcher_profiles.py
+# 投手-賽季的球種 / 配球預先彙總（/api/pitch-arsenal 與 /api/pitch-strategy 共用）
+# - 整季數據只做一次 groupby（打者站位 x 球數 x 球種），其餘視圖都由這張小表推導
+# - 結果依打者站位 (all / L / R) 預先整理成回應格式，端點只需查表
+# - 以 JSON 保存到 data/pitcher_profiles/，並記錄來源分割的版本（檔案清單）
+# - 失效：同一程序寫入新比賽時由 statcast_store.on_write 通知；
+#   其他程序（例如命令列 update）寫入時，每天第一次查詢會比對分割版本
+
+import json
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import statcast_store
+
+PROFILE_DIR = os.environ.get('PITCHER_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'pitcher_profiles'))
+PROFILE_COLUMNS = ['pitch_type', 'pitch_name', 'release_speed', 'release_spin_rate', 'pfx_x', 'pfx_z', 'stand', 'balls', 'strikes', 'pitch_number', 'events']
+GROUP_KEYS = ['stand', 'balls', 'strikes', 'pitch_type', 'pitch_name']
+STANCES = ('all', 'L', 'R')
+
+def aggregate(data):
+    # 單次 groupby：平均值以 (總和, 非空筆數) 保存，之後可任意合併
+    frame = data.reindex(columns=PROFILE_COLUMNS)
+    frame = frame.assign(
+        balls=pd.to_numeric(frame['balls'], errors='coerce').fillna(-1).astype(int),
+        strikes=pd.to_numeric(frame['strikes'], errors='coerce').fillna(-1).astype(int),
+        first_pitch=(pd.to_numeric(frame['pitch_number'], errors='coerce') == 1),
+        strikeout=(frame['events'] == 'strikeout'),
+    )
+    # 類別欄位只保留實際出現的組合 (observed=True)
+    return frame.groupby(GROUP_KEYS, dropna=False, sort=True, observed=True).agg(
+        pitches=('first_pitch', 'size'),
+        speed_sum=('release_speed', 'sum'), speed_n=('release_speed', 'count'), speed_max=('release_speed', 'max'),
+        spin_sum=('release_spin_rate', 'sum'), spin_n=('release_spin_rate', 'count'),
+        pfx_x_sum=('pfx_x', 'sum'), pfx_x_n=('pfx_x', 'count'),
+        pfx_z_sum=('pfx_z', 'sum'), pfx_z_n=('pfx_z', 'count'),
+        first_pitches=('first_pitch', 'sum'), strikeouts=('strikeout', 'sum'),
+    ).reset_index()
+
+def _ratio(total, count, scale=1.0):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count * scale, np.nan)
+
+def _rounded(value, digits=1):
+    # 先轉成 Python float 再四捨五入，float32 的彙總值才不會輸出成 94.30000305175781
+    return None if pd.isna(value) else round(float(value), digits)
+
+def arsenal_view(table):
+    # 與原本 /api/pitch-arsenal 相同的欄位；pfx 換算為英吋
+    table = table[table['pitch_name'].notna() & (table['pitch_name'] != '')]
+    if table.empty: return []
+    grouped = table.groupby('pitch_name', sort=True, observed=True).agg(
+        usage=('pitches', 'sum'), speed_sum=('speed_sum', 'sum'), speed_n=('speed_n', 'sum'), max_speed=('speed_max', 'max'),
+        spin_sum=('spin_sum', 'sum'), spin_n=('spin_n', 'sum'), pfx_x_sum=('pfx_x_sum', 'sum'), pfx_x_n=('pfx_x_n', 'sum'),
+        pfx_z_sum=('pfx_z_sum', 'sum'), pfx_z_n=('pfx_z_n', 'sum'),
+    )
+    avg_speed = _ratio(grouped['speed_sum'], grouped['speed_n'])
+    avg_spin = _ratio(grouped['spin_sum'], grouped['spin_n'])
+    avg_pfx_x = _ratio(grouped['pfx_x_sum'], grouped['pfx_x_n'], 12)
+    avg_pfx_z = _ratio(grouped['pfx_z_sum'], grouped['pfx_z_n'], 12)
+    usage_percentage = grouped['usage'] / grouped['usage'].sum() * 100
+    return [
+        {
+            "pitch_name": pitch_name, "usage": int(grouped['usage'].iloc[i]),
+            "avg_speed": _rounded(avg_speed[i]), "max_speed": _rounded(grouped['max_speed'].iloc[i]),
+            "avg_spin": _rounded(avg_spin[i]), "avg_pfx_x": _rounded(avg_pfx_x[i]),
+            "avg_pfx_z": _rounded(avg_pfx_z[i]), "usage_percentage": _rounded(usage_percentage.iloc[i]),
+        }
+        for i, pitch_name in enumerate(grouped.index)
+    ]
+
+def _tendencies(table, weight):
+    # 各球種佔比（%），與 value_counts(normalize=True) 相同，依次數由多到少
+    counts = table[table['pitch_type'].notna()].groupby('pitch_type', sort=True, observed=True)[weight].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind='mergesort')
+    if counts.empty: return {}
+    return {pitch_type: round(float(value), 1) for pitch_type, value in (counts / counts.sum() * 100).items()}
+
+def strategy_view(table):
+    by_count = {}
+    for (balls, strikes), count_table in table[(table['balls'] >= 0) & (table['strikes'] >= 0)].groupby(['balls', 'strikes'], sort=True):
+        by_count[f"{balls}-{strikes}"] = _tendencies(count_table, 'pitches')
+    return {
+        "pitches": int(table['pitches'].sum()),
+        "first_pitch": _tendencies(table, 'first_pitches'),
+        "two_strikes": _tendencies(table[table['strikes'] == 2], 'pitches'),
+        "strikeout_pitch": _tendencies(table, 'strikeouts'),
+        "by_count": by_count,
+    }
+
+def build_profile(data):
+    table = aggregate(data)
+    views = {stance: table if stance == 'all' else table[table['stand'] == stance] for stance in STANCES}
+    return {
+        "pitches": int(len(data)),
+        "arsenal": {stance: arsenal_view(view) for stance, view in views.items()},
+        "strategy": {stance: strategy_view(view) for stance, view in views.items()},
+    }
+
+class PitcherProfileStore:
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self._entries = {}        # (pitcher_id, season) -> {"version", "checked_on", "profile"}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.invalidations = 0
+        statcast_store.on_write(self.invalidate)
+
+    def invalidate(self, season, pitcher_id):
+        with self._lock:
+            if self._entries.pop((int(pitcher_id), int(season)), None) is not None:
+                self.invalidations += 1
+
+    # --- 持久化 ---
+    def _path(self, pitcher_id, season):
+        return os.path.join(self.directory, str(season), f"{pitcher_id}.json")
+
+    def _load_persisted(self, key):
+        try:
+            with open(self._path(*key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _persist(self, key, entry):
+        try:
+            os.makedirs(os.path.dirname(self._path(*key)), exist_ok=True)
+            tmp_path = self._path(*key) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": entry['version'], "profile": entry['profile']}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(*key))
+        except Exception as e:
+            print(f"保存投手 {key[0]} {key[1]} 年的球種彙總時出錯: {e}")
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    # --- 查詢 ---
+    def get(self, pitcher_id, season):
+        # 當天已確認過的彙總直接回傳；否則補齊數據、比對版本，必要時重建
+        key, today = (int(pitcher_id), int(season)), date.today().isoformat()
+        entry = self._entries.get(key)
+        if entry is not None and entry['checked_on'] == today:
+            self.hits += 1
+            return entry['profile']
+
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry['checked_on'] == today:
+                self.hits += 1
+                return entry['profile']
+            start, end = f'{season}-01-01', f'{season}-12-31'
+            synced = statcast_store.sync_pitcher(pitcher_id, start, end)
+            version = statcast_store.partition_version(pitcher_id, season)
+            # 同步失敗或本地還沒有這個分割時，結果不保存、也不記為今天已確認，下一個請求再試
+            confirmed = synced and bool(version)
+            entry = entry or self._load_persisted(key)
+            if entry is None or entry.get('version') != version:
+                data = statcast_store.read_pitcher(pitcher_id, start, end, columns=PROFILE_COLUMNS)
+                entry = {"version": version, "profile": build_profile(data)}
+                self.builds += 1
+                if confirmed: self._persist(key, entry)
+            if not confirmed: return entry['profile']
+            entry = {**entry, "checked_on": today}
+            self._entries[key] = entry
+            return entry['profile']
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds, "invalidations": self.invalidations}
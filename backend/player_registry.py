@@ -0,0 +1,203 @@
+# backend/player_registry.py
+# 離線球員名冊：Chadwick register 只載入一次，建立索引後供自動完成與 ID 對照使用
+# - 前綴索引：正規化後的 "first last" / "last first" / "last" 排序陣列 + 二分搜尋
+# - trigram 索引：前綴找不到時的模糊比對
+# - MLBAM <-> FanGraphs ID 對照：dict 查詢
+#
+# 名冊從本地快照檔載入 (data/chadwick_register.parquet)；快照不存在且允許連網時，
+# 會透過 pybaseball 下載一次並寫成快照。
+#
+# 建立快照: python player_registry.py
+
+import bisect
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from pybaseball import chadwick_register
+
+REGISTER_PATH = os.environ.get('PLAYER_REGISTER_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'chadwick_register.parquet'))
+OFFLINE = os.environ.get('STATCAST_OFFLINE', '0') == '1'
+REGISTER_COLUMNS = ['name_last', 'name_first', 'key_mlbam', 'key_retro', 'key_bbref', 'key_fangraphs', 'mlb_played_first', 'mlb_played_last']
+MIN_FUZZY_SCORE = 0.3
+# 載入失敗（例如離線且沒有快照、或下載失敗）後，這段時間內的查詢直接回報同一個錯誤，不重試下載
+REGISTER_RETRY_SECONDS = float(os.environ.get('PLAYER_REGISTER_RETRY_SECONDS', '300'))
+
+def normalize_name(name):
+    # 去除重音符號與標點，轉小寫並壓縮空白
+    if not isinstance(name, str): return ''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    name = ''.join(ch if ch.isalnum() or ch.isspace() else ' ' for ch in name.lower())
+    return ' '.join(name.split())
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _optional_int(value):
+    if value is None or pd.isna(value): return None
+    value = int(value)
+    return value if value >= 0 else None
+
+class PlayerRegistry:
+    def __init__(self, register):
+        register = register.dropna(subset=['key_mlbam'])
+        register = register[register['key_mlbam'].astype(float) > 0].reset_index(drop=True)
+        self.size = len(register)
+
+        # 以欄位陣列儲存，需要時才組成 dict
+        self._name_first = register['name_first'].fillna('').astype(str).to_numpy()
+        self._name_last = register['name_last'].fillna('').astype(str).to_numpy()
+        self._mlbam = register['key_mlbam'].astype('int64').to_numpy()
+        self._fangraphs = pd.to_numeric(register['key_fangraphs'], errors='coerce').fillna(-1).astype('int64').to_numpy()
+        self._retro = register['key_retro'].to_numpy()
+        self._bbref = register['key_bbref'].to_numpy()
+        self._played_first = pd.to_numeric(register['mlb_played_first'], errors='coerce').to_numpy()
+        self._played_last = pd.to_numeric(register['mlb_played_last'], errors='coerce').to_numpy()
+        # 近期球員優先：依最後出賽年份由新到舊的名次
+        self._by_recency = np.argsort(-np.nan_to_num(self._played_last, nan=0), kind='stable')
+        self._recency_rank = np.empty(self.size, dtype=np.int64)
+        self._recency_rank[self._by_recency] = np.arange(self.size)
+
+        self._by_mlbam = {int(mlbam): i for i, mlbam in enumerate(self._mlbam)}
+        self._mlbam_by_fangraphs = {int(fg): int(mlbam) for fg, mlbam in zip(self._fangraphs, self._mlbam) if fg >= 0}
+
+        firsts = [normalize_name(n) for n in self._name_first]
+        lasts = [normalize_name(n) for n in self._name_last]
+        self._exact = {}
+        prefix_entries = []
+        self._trigram_index = {}
+        self._trigram_counts = np.zeros(self.size, dtype=np.int32)
+        for i, (first, last) in enumerate(zip(firsts, lasts)):
+            full = f"{first} {last}".strip()
+            self._exact.setdefault((first, last), []).append(i)
+            if first: self._exact.setdefault(('', last), []).append(i)
+            for key in {full, f"{last} {first}".strip(), last}:
+                if key: prefix_entries.append((key, i))
+            grams = trigrams(full)
+            self._trigram_counts[i] = len(grams)
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(i)
+        prefix_entries.sort()
+        self._prefix_keys = [key for key, _ in prefix_entries]
+        self._prefix_ids = np.array([i for _, i in prefix_entries], dtype=np.int64)
+        self._trigram_index = {gram: np.array(ids, dtype=np.int64) for gram, ids in self._trigram_index.items()}
+        for key, ids in self._exact.items():
+            ids.sort(key=lambda i: self._recency_rank[i])
+
+    # --- 載入 ---
+    @classmethod
+    def load(cls, path=REGISTER_PATH):
+        if os.path.exists(path):
+            register = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        elif OFFLINE:
+            raise FileNotFoundError(f"找不到球員名冊快照 {path}，離線模式下無法下載")
+        else:
+            register = download_register(path)
+        return cls(register)
+
+    # --- 查詢 ---
+    def _row(self, i):
+        return {
+            "name_last": self._name_last[i],
+            "name_first": self._name_first[i],
+            "key_mlbam": int(self._mlbam[i]),
+            "key_retro": self._retro[i] if isinstance(self._retro[i], str) else None,
+            "key_bbref": self._bbref[i] if isinstance(self._bbref[i], str) else None,
+            "key_fangraphs": _optional_int(self._fangraphs[i]),
+            "mlb_played_first": _optional_int(self._played_first[i]),
+            "mlb_played_last": _optional_int(self._played_last[i]),
+        }
+
+    def by_mlbam(self, mlbam_id):
+        i = self._by_mlbam.get(int(mlbam_id))
+        return self._row(i) if i is not None else None
+
+    def mlbam_for_fangraphs(self, fangraphs_id):
+        return self._mlbam_by_fangraphs.get(int(fangraphs_id))
+
+    def fangraphs_for_mlbam(self, mlbam_id):
+        i = self._by_mlbam.get(int(mlbam_id))
+        return _optional_int(self._fangraphs[i]) if i is not None else None
+
+    def _prefix_ids_for(self, query, limit):
+        # 對整個前綴範圍依近期程度取前 limit 名（"jo"、"smith" 之類的前綴可能有上千筆）；
+        # 每位球員最多有 3 個前綴鍵，先以 partition 取 3 * limit 個最小名次再去重
+        lo = bisect.bisect_left(self._prefix_keys, query)
+        hi = bisect.bisect_left(self._prefix_keys, query + '\uffff', lo)
+        ranks = self._recency_rank[self._prefix_ids[lo:hi]]
+        if len(ranks) > 3 * limit:
+            ranks = np.partition(ranks, 3 * limit - 1)[:3 * limit]
+        return self._by_recency[np.unique(ranks)[:limit]].tolist()
+
+    def _fuzzy_ids_for(self, query, limit):
+        grams = trigrams(query)
+        hits = Counter()
+        for gram in grams:
+            ids = self._trigram_index.get(gram)
+            if ids is not None: hits.update(ids.tolist())
+        # Dice 係數
+        scored = [(2 * overlap / (len(grams) + self._trigram_counts[i]), i) for i, overlap in hits.items()]
+        scored = [item for item in scored if item[0] >= MIN_FUZZY_SCORE]
+        scored.sort(key=lambda item: (-item[0], self._recency_rank[item[1]]))
+        return [i for _, i in scored[:limit]]
+
+    def search(self, query, limit=7):
+        # 自動完成：先做前綴比對，不足時再用 trigram 模糊比對補上
+        query = normalize_name(query)
+        if not query: return []
+        ids = self._prefix_ids_for(query, limit)
+        if len(ids) < limit and len(query) >= 3:
+            ids += [i for i in self._fuzzy_ids_for(query, limit) if i not in ids][:limit - len(ids)]
+        return [self._row(i) for i in ids]
+
+    def lookup(self, last, first='', limit=5):
+        # 對應 playerid_lookup(last, first, fuzzy=True)：完全符合優先，否則模糊比對
+        last, first = normalize_name(last), normalize_name(first)
+        ids = self._exact.get((first, last))
+        if not ids and not last:
+            ids = self._exact.get(('', first))  # 只輸入一個字時視為姓氏
+        if not ids:
+            ids = self._fuzzy_ids_for(f"{first} {last}".strip(), limit)
+        return [self._row(i) for i in ids[:limit]]
+
+def download_register(path=REGISTER_PATH):
+    print("正在下載 Chadwick 球員名冊並建立本地快照...")
+    register = chadwick_register()
+    register = register[[c for c in REGISTER_COLUMNS if c in register.columns]]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    register.to_parquet(path, index=False)
+    return register
+
+_registry = None
+_registry_error = None  # (失敗時間, 例外)
+_registry_lock = threading.Lock()
+
+def get_player_registry():
+    # 可能需要下載名冊，會阻塞：在 event loop 上請先用 loaded_player_registry()，未載入時交給執行緒池
+    global _registry, _registry_error
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                if _registry_error and time.monotonic() - _registry_error[0] < REGISTER_RETRY_SECONDS:
+                    raise _registry_error[1]
+                try:
+                    _registry = PlayerRegistry.load()
+                except Exception as e:
+                    _registry_error = (time.monotonic(), e)
+                    raise
+                _registry_error = None
+    return _registry
+
+def loaded_player_registry():
+    # 已載入的名冊；尚未載入時回傳 None（不會觸發載入）
+    return _registry
+
+if __name__ == '__main__':
+    download_register()
+    print(f"已建立球員名冊快照: {REGISTER_PATH}")
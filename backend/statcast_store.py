@@ -0,0 +1,431 @@
+# backend/statcast_store.py
+# 本地 Statcast 欄式儲存：依賽季 / 投手分割的 Parquet 資料集，取代每次請求重新下載
+#
+# 目錄結構:
+#   data/statcast/season=2024/pitcher=543037/part-2024-04-01-2024-09-29-xxxx.parquet
+#   data/statcast/_manifest.json   (紀錄每位投手 / 全聯盟已涵蓋的日期區間)
+#
+# 用法:
+#   python statcast_store.py backfill --pitcher 543037            # 回填單一投手 2017 至今
+#   python statcast_store.py backfill --league --start 2025-04-01 # 回填全聯盟某段期間
+#   python statcast_store.py update                               # 補上次之後的新比賽日（含重抓最近幾天），並合併小檔案
+#   python statcast_store.py compact                              # 只合併各分割的小檔案
+#   python statcast_store.py import fixture.parquet               # 由本地 fixture 匯入（完全離線）
+
+import argparse
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pybaseball import statcast, statcast_pitcher
+
+from telemetry import data_source
+
+STORE_DIR = os.environ.get('STATCAST_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'statcast'))
+# STATCAST_OFFLINE=1 時永不連網，只讀取已存在的資料（例如由 fixture 匯入）
+OFFLINE = os.environ.get('STATCAST_OFFLINE', '0') == '1'
+FIRST_SEASON_START = date(2017, 1, 1)
+MANIFEST_FILE = '_manifest.json'
+ROW_GROUP_SIZE = 4096
+# Savant 常在隔天甚至數天後才補齊比賽數據：下載當下最近這幾天的比賽只算暫時涵蓋，
+# 之後的同步（每天最多一次）會重新下載這段期間（重複的投球在讀取與合併時去除）
+LATE_DATA_DAYS = int(os.environ.get('STATCAST_LATE_DATA_DAYS', '3'))
+
+ID_COLUMNS = ['pitcher', 'batter', 'game_pk', 'at_bat_number', 'pitch_number']
+DEDUP_KEYS = ['game_pk', 'at_bat_number', 'pitch_number']
+# 讀取後的記憶體型別：磁碟上仍為 float64 / Int64 / string（各批次 schema 才能合併），
+# 載入記憶體時浮點數降為 float32、計數與 ID 降為 int16 / int32、重複度高的文字欄位改為類別
+CATEGORY_COLUMNS = ['events', 'pitch_type', 'pitch_name', 'description', 'stand']
+INT16_COLUMNS = ['balls', 'strikes', 'outs_when_up', 'inning', 'at_bat_number', 'pitch_number']
+INT32_COLUMNS = ['pitcher', 'batter', 'game_pk']
+# Statcast 的文字欄位：某批次整欄皆為空時（例如沒有擊球入場的 bb_type）read_csv 會讀成 float64，
+# 寫入時仍固定為字串，新舊檔案的 schema 才能合併
+TEXT_COLUMNS = ['pitch_type', 'player_name', 'events', 'description', 'des', 'game_type', 'stand', 'p_throws', 'home_team', 'away_team',
+                'type', 'bb_type', 'inning_topbot', 'pitch_name', 'if_fielding_alignment', 'of_fielding_alignment', 'sv_id']
+# 本地沒有任何檔案時，回傳的空表至少包含這些欄位，讓下游的篩選不會出現 KeyError
+EMPTY_FRAME_COLUMNS = ['game_date', 'game_pk', 'pitcher', 'batter', 'at_bat_number', 'pitch_number', 'events', 'description', 'pitch_type', 'pitch_name', 'stand', 'balls', 'strikes']
+
+# _lock 只保護 manifest 的讀取-合併-寫入；下載期間只鎖住同一位投手（或全聯盟），
+# 一位投手的長時間回填不會擋住其他投手的同步
+_lock = threading.Lock()
+_download_locks = {}  # 投手 ID / 'league' -> threading.Lock
+_write_listeners = []
+
+class StatcastUnavailable(RuntimeError):
+    # 下載失敗，且本地完全沒有要求區間的數據
+    pass
+
+def on_write(listener):
+    # listener(season, pitcher_id) 在每個分割寫入新檔案後呼叫（例如讓投手-賽季的預先彙總失效）
+    _write_listeners.append(listener)
+
+# --- 日期與 manifest ---
+def _to_date(value):
+    if isinstance(value, datetime): return value.date()
+    if isinstance(value, date): return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def _manifest_path():
+    return os.path.join(STORE_DIR, MANIFEST_FILE)
+
+def read_manifest():
+    try:
+        with open(_manifest_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"league": None, "pitchers": {}}
+
+def _write_manifest(manifest):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp_path = _manifest_path() + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, _manifest_path())
+
+def _range_of(entry, today=None):
+    # today 有值時只回傳已確定的部分：fetched_on（區間尾端的下載日）之前 LATE_DATA_DAYS 天內的日期，
+    # 若不是今天下載的，視為尚未涵蓋
+    if not entry: return None
+    start, end = _to_date(entry['start']), _to_date(entry['end'])
+    fetched_on = entry.get('fetched_on')
+    if today is not None and fetched_on and _to_date(fetched_on) < today:
+        end = min(end, _to_date(fetched_on) - timedelta(days=LATE_DATA_DAYS))
+        if end < start: return None
+    return start, end
+
+def _merge_range(entry, start, end, fetched_on=None):
+    current = _range_of(entry)
+    merged_start, merged_end = (min(start, current[0]), max(end, current[1])) if current else (start, end)
+    merged = {"start": merged_start.isoformat(), "end": merged_end.isoformat()}
+    # 只有下載到區間尾端時才更新 fetched_on
+    tail_fetched_on = fetched_on if fetched_on and end >= merged_end else (entry or {}).get('fetched_on')
+    if tail_fetched_on: merged['fetched_on'] = tail_fetched_on
+    return merged
+
+def covered_range(pitcher_id, manifest=None, today=None):
+    # 投手自己的區間與全聯盟區間若相連則合併，否則以投手區間為準
+    # today：只計入已確定的日期（見 _range_of），決定要下載哪些日期時使用
+    manifest = manifest or read_manifest()
+    own = _range_of(manifest['pitchers'].get(str(int(pitcher_id))), today)
+    league = _range_of(manifest.get('league'), today)
+    if own and league and own[0] <= league[1] + timedelta(days=1) and league[0] <= own[1] + timedelta(days=1):
+        return min(own[0], league[0]), max(own[1], league[1])
+    return own or league
+
+# --- 寫入 ---
+def _normalize_for_store(df):
+    # 統一各欄型別，確保不同批次寫出的檔案 schema 可以合併
+    df = df.copy()
+    df['game_date'] = pd.to_datetime(df['game_date']).dt.strftime('%Y-%m-%d')
+    for col in df.columns:
+        if col == 'game_date': continue
+        if col in ID_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif col in TEXT_COLUMNS:
+            df[col] = df[col].astype('string')
+        elif pd.api.types.is_bool_dtype(df[col]):
+            continue
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype('float64')
+        else:
+            df[col] = df[col].astype('string')
+    return df.dropna(subset=['pitcher'])
+
+def write_frame(df):
+    if df is None or df.empty: return 0
+    df = _normalize_for_store(df)
+    seasons = df['game_date'].str[:4].astype(int)
+    written = 0
+    for (season, pitcher_id), part in df.groupby([seasons, 'pitcher'], sort=False):
+        part_dir = os.path.join(STORE_DIR, f'season={season}', f'pitcher={int(pitcher_id)}')
+        os.makedirs(part_dir, exist_ok=True)
+        # 依打者排序，讓 row group 統計值能有效過濾 batter 條件
+        part = part.sort_values(['batter', 'game_date', 'at_bat_number', 'pitch_number'])
+        file_name = f"part-{part['game_date'].min()}-{part['game_date'].max()}-{uuid.uuid4().hex[:8]}.parquet"
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, file_name), row_group_size=ROW_GROUP_SIZE)
+        written += len(part)
+        for listener in _write_listeners:
+            try:
+                listener(int(season), int(pitcher_id))
+            except Exception as e:
+                print(f"通知投手 {pitcher_id} {season} 年數據更新時出錯: {e}")
+    return written
+
+# --- 下載（僅補缺少的日期） ---
+def _fetch_pitcher(pitcher_id, start, end):
+    print(f"Statcast 儲存：下載投手 {pitcher_id} {start} 至 {end} 的數據...")
+    with data_source('savant'):
+        return statcast_pitcher(start.isoformat(), end.isoformat(), int(pitcher_id))
+
+def _fetch_league(start, end):
+    print(f"Statcast 儲存：下載全聯盟 {start} 至 {end} 的數據...")
+    with data_source('savant'):
+        return statcast(start_dt=start.isoformat(), end_dt=end.isoformat(), verbose=0)
+
+def _download_lock(key):
+    with _lock:
+        return _download_locks.setdefault(key, threading.Lock())
+
+def _last_complete_day():
+    # 當天比賽數據尚未完整，只視到昨天為止的日期為可涵蓋
+    return date.today() - timedelta(days=1)
+
+def ensure_pitcher(pitcher_id, start, end):
+    start, end = _to_date(start), min(_to_date(end), _last_complete_day())
+    if start > end: return
+    key, today = str(int(pitcher_id)), date.today()
+    with _download_lock(int(pitcher_id)):
+        covered = covered_range(pitcher_id, today=today)
+        if covered and covered[0] <= start and covered[1] >= end: return
+
+        # 只下載區間前後缺少的部分（中間若有空隙一併補齊，保持涵蓋區間連續）
+        missing = []
+        if not covered:
+            missing.append((start, end))
+        else:
+            if start < covered[0]: missing.append((start, covered[0] - timedelta(days=1)))
+            if end > covered[1]: missing.append((covered[1] + timedelta(days=1), end))
+
+        for fetch_start, fetch_end in missing:
+            write_frame(_fetch_pitcher(pitcher_id, fetch_start, fetch_end))
+            with _lock:
+                manifest = read_manifest()
+                entry = manifest['pitchers'].get(key)
+                seed = covered_range(pitcher_id, manifest) if entry is None else None
+                if seed:
+                    entry = {"start": seed[0].isoformat(), "end": seed[1].isoformat()}
+                manifest['pitchers'][key] = _merge_range(entry, fetch_start, fetch_end, fetched_on=today.isoformat())
+                _write_manifest(manifest)
+
+def ingest_league(start, end):
+    start, end = _to_date(start), min(_to_date(end), _last_complete_day())
+    if start > end: return 0
+    with _download_lock('league'):
+        written = write_frame(_fetch_league(start, end))
+        with _lock:
+            manifest = read_manifest()
+            manifest['league'] = _merge_range(manifest.get('league'), start, end, fetched_on=date.today().isoformat())
+            _write_manifest(manifest)
+    return written
+
+def import_fixture(path, start=None, end=None):
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    if df.empty: return 0
+    dates = pd.to_datetime(df['game_date'])
+    start = _to_date(start) if start else dates.min().date()
+    end = _to_date(end) if end else dates.max().date()
+    with _lock:
+        manifest = read_manifest()
+        written = write_frame(df)
+        for pitcher_id in pd.to_numeric(df['pitcher'], errors='coerce').dropna().astype(int).unique():
+            key = str(pitcher_id)
+            manifest['pitchers'][key] = _merge_range(manifest['pitchers'].get(key), start, end)
+        _write_manifest(manifest)
+    return written
+
+def update():
+    # 增量更新：抓取各區間結束日之後的新比賽日，並重新下載尚未確定的最近幾天；最後合併各分割的小檔案
+    manifest = read_manifest()
+    yesterday = _last_complete_day()
+    if manifest.get('league'):
+        settled = _range_of(manifest['league'], date.today())
+        first_day = settled[1] + timedelta(days=1) if settled else _range_of(manifest['league'])[0]
+        if first_day <= yesterday:
+            ingest_league(first_day, yesterday)
+    for key, entry in manifest['pitchers'].items():
+        ensure_pitcher(int(key), entry['start'], yesterday)
+    compact()
+
+def compact_partition(season, pitcher_id):
+    # 每次增量更新都會在分割內新增一個小檔案（讀取時每個檔案都要讀 schema）：
+    # 依寫入順序讀出、去除重複的投球（保留最後寫入的版本）後寫成單一檔案，再刪除舊檔案
+    part_dir = os.path.join(STORE_DIR, f'season={season}', f'pitcher={int(pitcher_id)}')
+    with _download_lock(int(pitcher_id)):
+        if not os.path.isdir(part_dir): return 0
+        files = sorted((os.path.join(part_dir, f) for f in os.listdir(part_dir) if f.endswith('.parquet')), key=os.path.getmtime)
+        if len(files) < 2: return 0
+        df = pd.concat([pq.read_table(f).to_pandas() for f in files], ignore_index=True)
+        write_frame(df.drop_duplicates(subset=DEDUP_KEYS, keep='last'))
+        for f in files:
+            os.remove(f)
+    return len(files)
+
+def compact():
+    merged = 0
+    if not os.path.isdir(STORE_DIR): return merged
+    for season_dir in sorted(os.listdir(STORE_DIR)):
+        if not season_dir.startswith('season='): continue
+        for pitcher_dir in sorted(os.listdir(os.path.join(STORE_DIR, season_dir))):
+            if not pitcher_dir.startswith('pitcher='): continue
+            try:
+                merged += compact_partition(int(season_dir.split('=')[1]), int(pitcher_dir.split('=')[1]))
+            except Exception as e:
+                print(f"合併 {season_dir}/{pitcher_dir} 的檔案時出錯: {e}")
+    return merged
+
+# --- 讀取（分割裁剪 + predicate pushdown） ---
+def _pitcher_files(pitcher_id, first_season, last_season):
+    files = []
+    for season in range(first_season, last_season + 1):
+        part_dir = os.path.join(STORE_DIR, f'season={season}', f'pitcher={int(pitcher_id)}')
+        if os.path.isdir(part_dir):
+            files.extend(os.path.join(part_dir, f) for f in sorted(os.listdir(part_dir)) if f.endswith('.parquet'))
+    return files
+
+def compact_frame(df, columns=None):
+    # 只保留需要的欄位並縮小型別；同一份規則也用於不經過本地儲存的全聯盟下載
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    dtypes = {}
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORY_COLUMNS:
+            if not isinstance(series.dtype, pd.CategoricalDtype): dtypes[col] = 'category'
+        elif col in INT16_COLUMNS or col in INT32_COLUMNS:
+            bits = 16 if col in INT16_COLUMNS else 32
+            # 有缺值時使用可為空的整數型別
+            dtypes[col] = f'int{bits}' if series.notna().all() else f'Int{bits}'
+        elif series.dtype == 'float64':
+            dtypes[col] = 'float32'
+    return df.astype(dtypes) if dtypes else df
+
+def partition_version(pitcher_id, season):
+    # 分割內的檔案名稱（含日期區間與隨機碼）；任何程序寫入新比賽後都會改變
+    part_dir = os.path.join(STORE_DIR, f'season={season}', f'pitcher={int(pitcher_id)}')
+    if not os.path.isdir(part_dir): return ''
+    return '|'.join(sorted(f for f in os.listdir(part_dir) if f.endswith('.parquet')))
+
+def _unified_schema(files):
+    schemas = [pq.read_schema(f).remove_metadata() for f in files]
+    try:
+        return pa.unify_schemas(schemas)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    # 舊檔案中同一欄可能有不同型別（例如全空的文字欄位被寫成 double）：
+    # 只要有一個檔案是字串就以字串讀取，純數值取 float64，由 dataset 在讀取時轉型
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            types.setdefault(field.name, []).append(field.type)
+    fields = []
+    for name, candidates in types.items():
+        distinct = [t for t in dict.fromkeys(candidates) if not pa.types.is_null(t)] or [pa.null()]
+        if len(distinct) == 1:
+            resolved = distinct[0]
+        elif all(pa.types.is_integer(t) for t in distinct):
+            resolved = pa.int64()
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in distinct):
+            resolved = pa.float64()
+        else:
+            resolved = pa.large_string()
+        fields.append(pa.field(name, resolved))
+    return pa.schema(fields)
+
+def read_pitcher(pitcher_id, start, end, batter_id=None, columns=None, compact=True):
+    try:
+        return _read_pitcher(pitcher_id, start, end, batter_id, columns, compact)
+    except FileNotFoundError:
+        # 列出檔案後分割剛好被合併（見 compact_partition）：重新列出再讀一次
+        return _read_pitcher(pitcher_id, start, end, batter_id, columns, compact)
+
+def _read_pitcher(pitcher_id, start, end, batter_id, columns, compact):
+    start, end = _to_date(start), _to_date(end)
+    files = _pitcher_files(pitcher_id, start.year, end.year)
+    if not files: return pd.DataFrame(columns=columns or EMPTY_FRAME_COLUMNS)
+
+    schema = _unified_schema(files)
+    dataset = ds.dataset(files, schema=schema, format='parquet')
+    expr = (ds.field('game_date') >= start.isoformat()) & (ds.field('game_date') <= end.isoformat())
+    if isinstance(batter_id, (list, tuple, set)):
+        # 整排打線：一次讀出所有指定打者的投球
+        expr = expr & ds.field('batter').isin([int(b) for b in batter_id])
+    elif batter_id is not None:
+        expr = expr & (ds.field('batter') == int(batter_id))
+    # 只讀需要的欄位，但去重用的鍵一定要讀進來
+    selected = None if columns is None else [c for c in dict.fromkeys(list(columns) + DEDUP_KEYS + ['game_date']) if c in schema.names]
+    table = dataset.to_table(columns=selected, filter=expr)
+    # 類別欄位直接由 Arrow 轉成 pandas 類別，不先展開成 Python 字串
+    categories = [c for c in CATEGORY_COLUMNS if c in table.column_names] if compact else None
+    df = table.to_pandas(categories=categories)
+
+    # 全聯盟與單一投手的下載區間可能重疊
+    if all(k in df.columns for k in DEDUP_KEYS):
+        df = df.drop_duplicates(subset=DEDUP_KEYS)
+    if 'game_date' in df.columns:
+        df['game_date'] = pd.to_datetime(df['game_date'])
+        sort_cols = [c for c in ['game_date', 'at_bat_number', 'pitch_number'] if c in df.columns]
+        df = df.sort_values(sort_cols, ascending=False)
+    if compact:
+        df = compact_frame(df, columns)
+    elif columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
+
+def _overlaps(covered, start, end):
+    return covered is not None and covered[0] <= end and start <= covered[1]
+
+def sync_pitcher(pitcher_id, start_dt, end_dt):
+    # 補齊本地缺少的日期；回傳 True 表示已與上游同步。下載失敗時：
+    # - 本地完全沒有這段區間的數據 -> 拋出 StatcastUnavailable（端點回傳錯誤，而不是「沒有對戰數據」）
+    # - 本地有舊數據 -> 記錄後回傳 False，呼叫端沿用既有資料但不可快取
+    if OFFLINE: return True
+    try:
+        ensure_pitcher(pitcher_id, start_dt, end_dt)
+        return True
+    except Exception as e:
+        if not _overlaps(covered_range(pitcher_id), _to_date(start_dt), min(_to_date(end_dt), _last_complete_day())):
+            raise StatcastUnavailable(f"無法下載投手 {pitcher_id} 的 Statcast 數據: {e}") from e
+        print(f"更新投手 {pitcher_id} 的本地 Statcast 數據時出錯，改用既有資料: {e}")
+        return False
+
+def load_statcast_pitcher(start_dt, end_dt, pitcher_id, batter_id=None, columns=None, compact=True):
+    # 取代 pybaseball.statcast_pitcher：先補齊本地缺少的日期，再從本地讀取
+    # columns 為呼叫端需要的欄位（見各模組的 *_COLUMNS）；compact=False 時保留磁碟上的原始型別
+    # batter_id 可為單一 ID 或 ID 清單
+    # 同步失敗時回傳的舊數據標記 attrs['stale'] = True（見 matchup_cache，不會被快取）
+    synced = sync_pitcher(pitcher_id, start_dt, end_dt)
+    df = read_pitcher(pitcher_id, start_dt, end_dt, batter_id=batter_id, columns=columns, compact=compact)
+    if not synced: df.attrs['stale'] = True
+    return df
+
+# --- 命令列 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地 Statcast Parquet 儲存的匯入工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    backfill = sub.add_parser('backfill', help="回填投手或全聯盟數據")
+    backfill.add_argument('--pitcher', type=int, action='append', default=[])
+    backfill.add_argument('--league', action='store_true')
+    backfill.add_argument('--start', default=FIRST_SEASON_START.isoformat())
+    backfill.add_argument('--end', default=date.today().isoformat())
+
+    sub.add_parser('update', help="下載上次匯入之後的新比賽日，並合併各分割的小檔案")
+    sub.add_parser('compact', help="合併各分割的小檔案")
+
+    imp = sub.add_parser('import', help="由本地 fixture (csv / parquet) 匯入")
+    imp.add_argument('path')
+    imp.add_argument('--start')
+    imp.add_argument('--end')
+
+    args = parser.parse_args(argv)
+    if args.command == 'backfill':
+        if args.league:
+            print(f"已寫入 {ingest_league(args.start, args.end)} 筆投球數據")
+        for pitcher_id in args.pitcher:
+            ensure_pitcher(pitcher_id, args.start, args.end)
+    elif args.command == 'update':
+        update()
+    elif args.command == 'compact':
+        print(f"已合併 {compact()} 個檔案")
+    elif args.command == 'import':
+        print(f"已寫入 {import_fixture(args.path, args.start, args.end)} 筆投球數據")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+# backend/telemetry.py
+# 延遲與資料來源的量測：
+# - Histogram / Counter：Prometheus 文字格式，由 /metrics 輸出（不依賴 prometheus_client）
+# - stage()：請求內各階段的計時（resolve 名稱解析 / fetch 資料讀取 / aggregate 彙總 / serialize 序列化）
+# - data_source()：上游下載（Savant、FanGraphs、MLB 頭像）的耗時與成功 / 失敗次數
+# - Server-Timing：SERVER_TIMING=1 時每個回應都附上；否則請求帶 X-Server-Timing: 1 時才附上
+# - 慢請求取樣分析：SLOW_REQUEST_PROFILE=1 時，依 PROFILE_SAMPLE_RATE 抽樣請求，
+#   以背景執行緒定期取樣所有執行緒的堆疊；超過 SLOW_REQUEST_SECONDS 的請求會把
+#   摺疊後的堆疊（flamegraph.pl / speedscope 可讀的格式）寫到 data/profiles/
+
+import asyncio
+import functools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+
+SERVER_TIMING_ALWAYS = os.environ.get('SERVER_TIMING', '0') == '1'
+SERVER_TIMING_REQUEST_HEADER = 'x-server-timing'
+SLOW_REQUEST_PROFILE = os.environ.get('SLOW_REQUEST_PROFILE', '0') == '1'
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', '2.0'))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0.1'))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_SECONDS', '0.005'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles'))
+
+# Savant 下載可能長達數十秒，預設的 Prometheus 桶再加上 30 / 60 秒
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGES = ('resolve', 'fetch', 'aggregate', 'serialize')
+
+# --- 指標 ---
+def _format_labels(names, values):
+    if not names: return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}         # labels -> [各桶次數..., +Inf 次數, 總和]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names + ('le',), labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in items)
+        return lines
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time until the response headers are ready.', ('route', 'method', 'status'))
+STAGE_DURATION = Histogram('request_stage_duration_seconds', 'Time spent per request stage.', ('route', 'stage'))
+SOURCE_DURATION = Histogram('data_source_duration_seconds', 'Upstream data source latency.', ('source',))
+SOURCE_REQUESTS = CounterMetric('data_source_requests_total', 'Upstream data source calls by outcome.', ('source', 'outcome'))
+SLOW_REQUESTS = CounterMetric('slow_requests_total', 'Requests slower than SLOW_REQUEST_SECONDS.', ('route',))
+METRICS = [REQUEST_DURATION, STAGE_DURATION, SOURCE_DURATION, SOURCE_REQUESTS, SLOW_REQUESTS]
+
+def render_metrics(gauges=()):
+    # gauges: [(名稱, 說明, 標籤名稱, [(標籤值, 數值), ...])]，例如各端點的執行中 / 排隊數
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, help_text, label_names, samples in gauges:
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+        lines.extend(f"{name}{_format_labels(label_names, labels)} {value}" for labels, value in samples)
+    return '\n'.join(lines) + '\n'
+
+# --- 請求內的階段計時 ---
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}          # 階段 -> 累計秒數
+        self._active = Counter()  # 巢狀或並行的同名階段只計一次
+
+    def server_timing(self, total):
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ', '.join(parts)
+
+_current = ContextVar('request_timing', default=None)
+
+@contextmanager
+def stage(name):
+    # 可包住 await：量測的是該階段的經過時間（含等待執行緒池）
+    timing = _current.get()
+    if timing is None or timing._active[name]:
+        yield
+        return
+    timing._active[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing._active[name] -= 1
+        timing.stages[name] = timing.stages.get(name, 0.0) + time.perf_counter() - started
+
+@contextmanager
+def data_source(source):
+    # 上游呼叫的耗時；在執行緒池中同樣可用
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        SOURCE_REQUESTS.inc(source, 'error')
+        raise
+    else:
+        SOURCE_REQUESTS.inc(source, 'ok')
+    finally:
+        SOURCE_DURATION.observe(time.perf_counter() - started, source)
+
+# --- 慢請求取樣分析 ---
+class StackSampler:
+    # 只有在有被抽樣的請求進行中時才啟動取樣執行緒
+    def __init__(self, interval=PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._sessions = {}       # session id -> Counter(摺疊堆疊)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._next_id = 0
+
+    def start(self):
+        with self._lock:
+            self._next_id += 1
+            session = self._next_id
+            self._sessions[session] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='slow-request-sampler', daemon=True)
+                self._thread.start()
+            return session
+
+    def stop(self, session):
+        with self._lock:
+            return self._sessions.pop(session, Counter())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = list(self._sessions.values())
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id: continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                # 同一時間的其他請求也會被取樣，以執行緒名稱區分事件迴圈與各個執行緒池
+                collapsed = ';'.join([names.get(thread_id, str(thread_id))] + stack[::-1])
+                for counts in sessions:
+                    counts[collapsed] += 1
+
+_sampler = StackSampler()
+
+def _write_profile(route, seconds, counts):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+        path = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{slug}-{int(seconds * 1000)}ms.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+        print(f"慢請求 {route} 耗時 {seconds:.2f} 秒，取樣結果已寫入 {path}")
+    except Exception as e:
+        print(f"寫入慢請求取樣結果時出錯: {e}")
+
+# --- 序列化階段 ---
+class TimedRoute(APIRoute):
+    # 端點回傳一般物件時改在這裡序列化（與 FastAPI 預設的 jsonable_encoder + JSONResponse 相同），
+    # 以便計入 serialize 階段；回傳 Response 或宣告 response_model 的端點不受影響
+    def __init__(self, path, endpoint, **kwargs):
+        response_model = kwargs.get('response_model')
+        if asyncio.iscoroutinefunction(endpoint) and getattr(response_model, 'value', response_model) is None:
+            endpoint = _serialize_timed(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+def _serialize_timed(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response): return result
+        with stage('serialize'):
+            return JSONResponse(jsonable_encoder(result))
+    return wrapper
+
+# --- 中介軟體 ---
+def _route_template(request):
+    # 以路由樣板作為標籤（避免把查詢參數或球員姓名變成高基數標籤）
+    route = request.scope.get('route')
+    return getattr(route, 'path', None) or 'unmatched'
+
+async def timing_middleware(request, call_next):
+    timing = RequestTiming()
+    token = _current.set(timing)
+    session = _sampler.start() if SLOW_REQUEST_PROFILE and random.random() < PROFILE_SAMPLE_RATE else None
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        _current.reset(token)
+        total = time.perf_counter() - timing.started
+        counts = _sampler.stop(session) if session is not None else None
+        route = _route_template(request)
+        REQUEST_DURATION.observe(total, route, request.method, str(status))
+        for name, seconds in timing.stages.items():
+            STAGE_DURATION.observe(seconds, route, name)
+        if total >= SLOW_REQUEST_SECONDS:
+            SLOW_REQUESTS.inc(route)
+            if counts: _write_profile(route, total, counts)
+    if SERVER_TIMING_ALWAYS or request.headers.get(SERVER_TIMING_REQUEST_HEADER) == '1':
+        response.headers['Server-Timing'] = timing.server_timing(total)
+    return response
@@ -0,0 +1,90 @@
+# backend/tests/test_headshots.py
+# HeadshotResolver 對本地的 aiohttp 假伺服器查詢：重複查詢不發 HEAD、404 的負向快取會到期、暫時性錯誤只短暫快取
+# 執行方式（於 backend 目錄）: python -m pytest tests
+
+import asyncio
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from headshots import HEADSHOT_ERROR_TTL_SECONDS, HeadshotResolver
+
+FOUND, MISSING, UNAVAILABLE = 543037, 592450, 660271
+STATUSES = {FOUND: 200, MISSING: 404, UNAVAILABLE: 503}
+
+async def _with_stub_server(scenario):
+    hits = Counter()
+
+    async def head(request):
+        player_id = int(request.match_info['player_id'])
+        hits[player_id] += 1
+        return web.Response(status=STATUSES.get(player_id, 404))
+
+    app = web.Application()
+    app.router.add_route('HEAD', r'/{player_id:\d+}.jpg', head)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    try:
+        await scenario(f'http://{host}:{port}', hits)
+    finally:
+        await runner.cleanup()
+
+def test_repeat_lookups_do_no_network_io(tmp_path):
+    cache_path = str(tmp_path / 'headshots.json')
+
+    async def scenario(base_url, hits):
+        resolver = HeadshotResolver(base_url=base_url, cache_path=cache_path)
+        await resolver.start()
+        url = await resolver.resolve(FOUND)
+        assert url == f'{base_url}/{FOUND}.jpg'
+        assert await resolver.resolve(MISSING) is None
+        assert resolver.requests == 2
+
+        # 再查詢（包括同時多個請求查同一位球員）都不會再發出 HEAD
+        for _ in range(3):
+            assert await resolver.resolve(FOUND) == url
+            assert await resolver.resolve(MISSING) is None
+        assert await asyncio.gather(*(resolver.resolve(FOUND) for _ in range(5))) == [url] * 5
+        assert resolver.requests == 2
+        assert hits == Counter({FOUND: 1, MISSING: 1})
+        await resolver.close()
+
+        # 持久化的快取讓重新啟動後的查詢同樣不需要連線
+        restarted = HeadshotResolver(base_url=base_url, cache_path=cache_path)
+        assert await restarted.resolve(FOUND) == url
+        assert await restarted.resolve(MISSING) is None
+        assert restarted.requests == 0
+        await restarted.close()
+
+    asyncio.run(_with_stub_server(scenario))
+
+def test_missing_headshot_expires(tmp_path):
+    async def scenario(base_url, hits):
+        resolver = HeadshotResolver(base_url=base_url, cache_path=str(tmp_path / 'headshots.json'), negative_ttl=0.2)
+        assert await resolver.resolve(MISSING) is None
+        assert await resolver.resolve(MISSING) is None
+        assert resolver.requests == 1
+        await asyncio.sleep(0.3)
+        assert await resolver.resolve(MISSING) is None
+        assert resolver.requests == 2
+        assert hits[MISSING] == 2
+        await resolver.close()
+
+    asyncio.run(_with_stub_server(scenario))
+
+def test_transient_error_is_cached_briefly(tmp_path):
+    async def scenario(base_url, hits):
+        resolver = HeadshotResolver(base_url=base_url, cache_path=str(tmp_path / 'headshots.json'), negative_ttl=7 * 24 * 3600)
+        assert await resolver.resolve(UNAVAILABLE) is None
+        assert resolver.errors == 1
+        # 503 不套用 7 天的負向快取
+        assert resolver._missing[UNAVAILABLE] <= time.time() + HEADSHOT_ERROR_TTL_SECONDS
+        assert await resolver.resolve(UNAVAILABLE) is None
+        assert resolver.requests == 1
+        await resolver.close()
+
+    asyncio.run(_with_stub_server(scenario))
@@ -0,0 +1,105 @@
+# backend/trajectory_codec.py
+# /api/3d-trajectory 的欄式二進位格式（JSON 仍為預設）
+#
+# 格式選擇：?format=json|packed|arrow，或 Accept 標頭
+#   application/x-statcast-trajectory   -> packed
+#   application/vnd.apache.arrow.stream -> arrow
+#
+# packed：由多個可獨立解碼的區塊 (chunk) 串接而成，每個區塊為
+#   b'STC1' | uint32 header 長度 | header JSON (utf-8) | body
+#   header = {"count": n, "columns": [...], "pitch_types": [...], "dtype": "<f4"}
+#   body   = uint8 pitch_type 代碼 [n]（補齊到 4 bytes）+ 每個欄位 little-endian float32 [n]
+# arrow：Arrow IPC stream，pitch_type 為 dictionary 編碼，數值欄位為 float32，每個區塊一個 record batch
+
+import io
+import json
+import struct
+
+import numpy as np
+import pyarrow as pa
+
+from matchup_panels import TRAJECTORY_COLUMNS
+
+PACKED_MEDIA_TYPE = 'application/x-statcast-trajectory'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+FORMATS = ('json', 'packed', 'arrow')
+MEDIA_TYPES = {'packed': PACKED_MEDIA_TYPE, 'arrow': ARROW_MEDIA_TYPE}
+PACKED_MAGIC = b'STC1'
+DEFAULT_CHUNK_SIZE = 4096
+FLOAT_COLUMNS = [col for col in TRAJECTORY_COLUMNS if col != 'pitch_type']
+
+def negotiate_format(format_param=None, accept=None):
+    if format_param:
+        if format_param not in FORMATS: raise ValueError(f"未知的格式: {format_param}")
+        return format_param
+    accept = accept or ''
+    if ARROW_MEDIA_TYPE in accept: return 'arrow'
+    if PACKED_MEDIA_TYPE in accept: return 'packed'
+    return 'json'
+
+def _pitch_type_codes(frame):
+    categories = frame['pitch_type'].astype('category')
+    return categories.cat.codes.to_numpy(dtype=np.uint8), [str(c) for c in categories.cat.categories]
+
+def _packed_chunk(frame):
+    codes, pitch_types = _pitch_type_codes(frame)
+    count = len(frame)
+    header = json.dumps({"count": count, "columns": FLOAT_COLUMNS, "pitch_types": pitch_types, "dtype": "<f4"}).encode('utf-8')
+    padding = (-count) % 4
+    parts = [PACKED_MAGIC, struct.pack('<I', len(header)), header, codes.tobytes(), b'\x00' * padding]
+    # 各欄位依序排列，前端可直接以 Float32Array 包住對應區段
+    values = frame[FLOAT_COLUMNS].to_numpy(dtype='<f4').T
+    parts.append(np.ascontiguousarray(values).tobytes())
+    return b''.join(parts)
+
+def encode_packed_chunks(frame, chunk_size=DEFAULT_CHUNK_SIZE):
+    if frame.empty:
+        yield _packed_chunk(frame)
+        return
+    for start in range(0, len(frame), chunk_size):
+        yield _packed_chunk(frame.iloc[start:start + chunk_size])
+
+def decode_packed(payload):
+    # 給效能測試與除錯使用的解碼器
+    offset, chunks = 0, []
+    while offset < len(payload):
+        assert payload[offset:offset + 4] == PACKED_MAGIC
+        header_len, = struct.unpack_from('<I', payload, offset + 4)
+        header = json.loads(payload[offset + 8:offset + 8 + header_len])
+        offset += 8 + header_len
+        count = header['count']
+        codes = np.frombuffer(payload, dtype=np.uint8, count=count, offset=offset)
+        offset += count + (-count) % 4
+        values = np.frombuffer(payload, dtype='<f4', count=count * len(header['columns']), offset=offset).reshape(len(header['columns']), count)
+        offset += values.nbytes
+        chunk = {col: values[i] for i, col in enumerate(header['columns'])}
+        chunk['pitch_type'] = np.array(header['pitch_types'], dtype=object)[codes] if count else np.array([], dtype=object)
+        chunks.append(chunk)
+    return chunks
+
+ARROW_SCHEMA = pa.schema([pa.field('pitch_type', pa.dictionary(pa.int32(), pa.string()))] + [pa.field(col, pa.float32()) for col in FLOAT_COLUMNS])
+
+def _arrow_batch(frame):
+    arrays = [pa.array(frame['pitch_type'].astype(str).tolist(), type=pa.string()).dictionary_encode()]
+    arrays += [pa.array(frame[col].to_numpy(dtype=np.float32), type=pa.float32()) for col in FLOAT_COLUMNS]
+    return pa.RecordBatch.from_arrays(arrays, schema=ARROW_SCHEMA)
+
+class _ChunkSink(io.BytesIO):
+    def close(self):
+        pass  # 關閉 writer 時 pyarrow 可能一併關閉 sink，保留緩衝區以便送出最後的結束標記
+
+def encode_arrow_chunks(frame, chunk_size=DEFAULT_CHUNK_SIZE):
+    # 每寫入一個 record batch 就把目前的位元組送出，不需等整份資料編碼完成
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, ARROW_SCHEMA) as writer:
+        for start in range(0, len(frame), chunk_size):
+            writer.write_batch(_arrow_batch(frame.iloc[start:start + chunk_size]))
+            chunk = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            if chunk: yield chunk
+    if sink.getvalue(): yield sink.getvalue()
+
+def encode_chunks(frame, output_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    if output_format == 'arrow': return encode_arrow_chunks(frame, chunk_size)
+    return encode_packed_chunks(frame, chunk_size)
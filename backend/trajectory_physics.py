@@ -0,0 +1,152 @@
+# backend/trajectory_physics.py
+# 投球軌跡的等加速度模型（Statcast 9 參數：vx0/vy0/vz0、ax/ay/az 定義在 y = 50 ft）
+# 以 NumPy broadcasting 一次計算所有投球：
+#   1. 由 release_pos_y 與 y = 17/12 ft（本壘板前緣）解出出手與進壘的時間
+#   2. 由出手點反推 y = 50 ft 時的 x、z
+#   3. 在出手到進壘之間等距取樣固定數量的點
+# 座標單位為 ft（捕手視角，x 向右為正），時間單位為秒。
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from matchup_panels import TRAJECTORY_COLUMNS, json_records
+
+Y0 = 50.0
+PLATE_Y = 17 / 12
+MOUND_TO_PLATE = 60.5
+DEFAULT_RELEASE_Y = 54.0
+GRAVITY = 32.174  # ft/s^2
+FT_PER_S_TO_MPH = 3600 / 5280
+DEFAULT_SAMPLES = 20
+MAX_SAMPLES = 100
+PATH_CACHE_ENTRIES = 64
+
+KINEMATIC_COLUMNS = ['vx0', 'vy0', 'vz0', 'ax', 'ay', 'az', 'release_pos_x', 'release_pos_z']
+PHYSICS_COLUMNS = ['pitch_type', 'release_speed', 'release_pos_x', 'release_pos_y', 'release_pos_z', 'release_extension',
+                   'vx0', 'vy0', 'vz0', 'ax', 'ay', 'az', 'plate_x', 'plate_z', 'sz_top', 'sz_bot']
+
+def solve_time(vy0, ay, y_target):
+    # 0.5*ay*t^2 + vy0*t + (Y0 - y_target) = 0，取物理上合理的根（球往本壘方向，vy0 < 0）
+    distance = Y0 - y_target
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discriminant = vy0 ** 2 - 2 * ay * distance
+        quadratic = (-vy0 - np.sqrt(discriminant)) / ay
+        linear = -distance / vy0
+    return np.where(np.abs(ay) > 1e-9, quadratic, linear)
+
+def _column(frame, name, default=np.nan):
+    if name in frame.columns:
+        return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+    return np.full(len(frame), default, dtype=np.float64)
+
+def evaluate(frame, samples=DEFAULT_SAMPLES):
+    # 回傳 (有效的投球, 軌跡點 [n, samples, 3] float32, 出手時間, 進壘時間)
+    if frame.empty or not all(col in frame.columns for col in KINEMATIC_COLUMNS):
+        return frame.iloc[0:0], np.empty((0, samples, 3), dtype=np.float32), np.empty(0), np.empty(0)
+    vx0, vy0, vz0 = _column(frame, 'vx0'), _column(frame, 'vy0'), _column(frame, 'vz0')
+    ax, ay, az = _column(frame, 'ax'), _column(frame, 'ay'), _column(frame, 'az')
+    release_x, release_z = _column(frame, 'release_pos_x'), _column(frame, 'release_pos_z')
+    # 缺少 release_pos_y 時以延伸距離估計
+    release_y = _column(frame, 'release_pos_y')
+    release_y = np.where(np.isnan(release_y), MOUND_TO_PLATE - _column(frame, 'release_extension'), release_y)
+    release_y = np.where(np.isnan(release_y), DEFAULT_RELEASE_Y, release_y)
+
+    t_release = solve_time(vy0, ay, release_y)
+    t_plate = solve_time(vy0, ay, PLATE_Y)
+    valid = np.isfinite(np.column_stack([vx0, vz0, ax, az, release_x, release_z, t_release, t_plate])).all(axis=1) & (t_plate > t_release)
+
+    vx0, vy0, vz0, ax, ay, az = (a[valid] for a in (vx0, vy0, vz0, ax, ay, az))
+    release_x, release_z, t_release, t_plate = release_x[valid], release_z[valid], t_release[valid], t_plate[valid]
+    x50 = release_x - vx0 * t_release - 0.5 * ax * t_release ** 2
+    z50 = release_z - vz0 * t_release - 0.5 * az * t_release ** 2
+
+    t = t_release[:, None] + (t_plate - t_release)[:, None] * np.linspace(0.0, 1.0, samples)[None, :]
+    x = x50[:, None] + vx0[:, None] * t + 0.5 * ax[:, None] * t ** 2
+    y = Y0 + vy0[:, None] * t + 0.5 * ay[:, None] * t ** 2
+    z = z50[:, None] + vz0[:, None] * t + 0.5 * az[:, None] * t ** 2
+    paths = np.stack([x, y, z], axis=-1).astype(np.float32)
+    return frame[valid], paths, t_release, t_plate
+
+def derived_metrics(frame, t_release, t_plate):
+    # 飛行時間與相對於「出手後不受加速度影響的直線」的位移（英吋）
+    flight_time = t_plate - t_release
+    ax, ay, az = _column(frame, 'ax'), _column(frame, 'ay'), _column(frame, 'az')
+    vx0, vy0, vz0 = _column(frame, 'vx0'), _column(frame, 'vy0'), _column(frame, 'vz0')
+    plate_speed = np.sqrt((vx0 + ax * t_plate) ** 2 + (vy0 + ay * t_plate) ** 2 + (vz0 + az * t_plate) ** 2) * FT_PER_S_TO_MPH
+    return {
+        "flight_time": flight_time,
+        "break_x_in": 0.5 * ax * flight_time ** 2 * 12,
+        "break_z_in": 0.5 * az * flight_time ** 2 * 12,
+        "induced_break_z_in": 0.5 * (az + GRAVITY) * flight_time ** 2 * 12,
+        "plate_speed": plate_speed,
+    }
+
+def _rounded(values, digits):
+    return np.round(values.astype(np.float64), digits).tolist()
+
+def pitch_paths(frame, samples=DEFAULT_SAMPLES, include_derived=False):
+    # 欄式 JSON：每個欄位一個陣列，paths 為 [n][samples][3]
+    valid, paths, t_release, t_plate = evaluate(frame, samples)
+    payload = {
+        "count": int(len(valid)),
+        "samples": samples,
+        "pitch_type": valid['pitch_type'].astype(str).tolist() if 'pitch_type' in valid.columns else [],
+        "release_speed": _rounded(_column(valid, 'release_speed'), 1),
+        "paths": _rounded(paths, 3),
+    }
+    if include_derived:
+        for name, values in derived_metrics(valid, t_release, t_plate).items():
+            payload[name] = _rounded(values, 3)
+    return payload
+
+def trajectory_records_with_paths(frame, samples=DEFAULT_SAMPLES, include_derived=False):
+    # /api/3d-trajectory 的 JSON 格式，每筆紀錄額外附上取樣後的軌跡點
+    frame = frame.dropna(subset=[c for c in TRAJECTORY_COLUMNS if c in frame.columns])
+    valid, paths, t_release, t_plate = evaluate(frame, samples)
+    records = json_records(valid[[c for c in TRAJECTORY_COLUMNS if c in valid.columns]])
+    path_lists = _rounded(paths, 3)
+    derived = derived_metrics(valid, t_release, t_plate) if include_derived else {}
+    derived = {name: _rounded(values, 3) for name, values in derived.items()}
+    for i, record in enumerate(records):
+        record['path'] = path_lists[i]
+        for name, values in derived.items():
+            record[name] = values[i]
+    return records
+
+class PitchPathCache:
+    # 投手-賽季的軌跡結果快取（LRU）。鍵包含資料庫的涵蓋終點，新比賽寫入後自然失效。
+    def __init__(self, max_entries=PATH_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, pitcher_id=None):
+        with self._lock:
+            for key in [k for k in self._entries if pitcher_id is None or k[0] == pitcher_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}